@@ -21,7 +21,7 @@ def create_logo(filename, size=(300, 100), text="ToastyVotes", bg_color=(255, 25
     draw.text(position, text, fill=text_color, font=font)
     
     # Save the image
-    img.save(filename)
+    img.save(filename, optimize=True)
 
 def create_icon(filename, size=(100, 100), icon_type="vote", bg_color=(255, 255, 255), icon_color=(255, 140, 0)):
     # Create a white image
@@ -46,7 +46,7 @@ def create_icon(filename, size=(100, 100), icon_type="vote", bg_color=(255, 255,
         draw.ellipse([(55, 20), (75, 40)], fill=icon_color)
     
     # Save the image
-    img.save(filename)
+    img.save(filename, optimize=True)
 
 def main():
     # Ensure directory exists
@@ -64,6 +64,7 @@ def main():
     create_icon(os.path.join(images_dir, 'trophy.png'), icon_type="trophy", size=(50, 50))
     
     print("Placeholder images created successfully!")
+    print("Run 'python manage.py build_images' to regenerate the responsive variants and favicons.")
 
 if __name__ == "__main__":
     main()
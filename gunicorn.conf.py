@@ -0,0 +1,55 @@
+"""
+Gunicorn configuration for ToastyVotes.
+
+Gunicorn reads ./gunicorn.conf.py automatically, so from the project root:
+
+    gunicorn toastyvotes.wsgi
+
+Every value can be overridden with the GUNICORN_* environment variables below.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '127.0.0.1:8000')
+
+# Import Django and the project once in the master process; workers are forked
+# with everything already loaded instead of each importing it again.
+preload_app = True
+
+# Threads keep a worker responsive while one request waits on the AI service.
+worker_class = 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# Recycle workers to cap memory growth; the jitter stops them all restarting
+# (and going cold) at the same moment.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# Table Topics generation can retry the AI call, so allow slow requests.
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+
+
+def post_fork(server, worker):
+    """Compile URLs, load templates and connect this thread (the request thread of sync workers)"""
+    from voting.warmup import warm_up
+
+    timings = warm_up()
+    server.log.info('Worker %s warmed up: %s', worker.pid,
+                    ', '.join(f'{step} {ms:.0f} ms' for step, ms in timings.items()))
+
+
+def post_worker_init(worker):
+    """Connect the request threads to the database before the worker accepts connections"""
+    from django.db import connections
+    from voting.warmup import warm_thread_pool
+
+    # gthread workers serve requests from this pool, not from the main thread
+    pool = getattr(worker, 'tpool', None)
+    if pool is not None:
+        connected = warm_thread_pool(pool, worker.cfg.threads)
+        # The main thread never serves a request; don't keep its connection open
+        connections.close_all()
+        worker.log.info('Worker %s connected %s request thread(s)', worker.pid, connected)
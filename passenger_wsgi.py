@@ -1,6 +1,5 @@
 import os
 import sys
-import importlib.util
 from pathlib import Path
 
 # Add the project directory to the Python path
@@ -10,11 +9,9 @@ sys.path.insert(0, str(CURRENT_DIR))
 # Set environment variables
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'toastyvotes.settings')
 
-# Import Django WSGI application
-spec = importlib.util.spec_from_file_location(
-    "application", 
-    os.path.join(CURRENT_DIR, "toastyvotes", "wsgi.py")
-)
-wsgi_module = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(wsgi_module)
-application = wsgi_module.application
+# Import Django WSGI application (a plain import reuses toastyvotes/__pycache__)
+from toastyvotes.wsgi import application
+
+# Passenger starts a fresh process per worker; warm it before the first request
+from voting.warmup import warm_up
+warm_up()
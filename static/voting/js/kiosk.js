@@ -0,0 +1,124 @@
+// ToastyVotes kiosk mode
+//
+// Ballots are written to IndexedDB the moment they are submitted, then
+// uploaded in batches whenever the device is online. Each ballot carries a
+// random key, so re-sending a batch after a dropped response never counts
+// a ballot twice.
+
+const DB_NAME = 'toastyvotes-kiosk';
+const STORE = 'ballots';
+const UPLOAD_INTERVAL_MS = 15000;
+const THANKS_MS = 4000;
+
+const kiosk = document.getElementById('kiosk');
+const uploadUrl = kiosk.dataset.uploadUrl;
+const sessionCode = kiosk.dataset.session;
+const maxBatch = parseInt(kiosk.dataset.maxBatch, 10);
+const form = document.getElementById('kiosk-form');
+let uploading = false;
+
+function openDatabase() {
+    return new Promise((resolve, reject) => {
+        const request = indexedDB.open(DB_NAME, 1);
+        request.onupgradeneeded = () => {
+            const store = request.result.createObjectStore(STORE, { keyPath: 'key' });
+            store.createIndex('session', 'session');
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+const dbPromise = openDatabase();
+
+async function withStore(mode, callback) {
+    const db = await dbPromise;
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction(STORE, mode);
+        const result = callback(tx.objectStore(STORE));
+        tx.oncomplete = () => resolve(result && 'result' in result ? result.result : undefined);
+        tx.onerror = () => reject(tx.error);
+    });
+}
+
+function pendingBallots() {
+    return withStore('readonly', store => store.index('session').getAll(sessionCode));
+}
+
+function newKey() {
+    if (self.crypto && crypto.randomUUID) return crypto.randomUUID();
+    // randomUUID needs a secure context; fall back to 128 random bits
+    const bytes = crypto.getRandomValues(new Uint8Array(16));
+    return Array.from(bytes, b => b.toString(16).padStart(2, '0')).join('');
+}
+
+async function showPending(message) {
+    const pending = await pendingBallots();
+    document.getElementById('kiosk-pending').textContent = pending.length;
+    if (message) document.getElementById('kiosk-status').textContent = message;
+}
+
+async function upload() {
+    if (uploading || !navigator.onLine) return;
+    uploading = true;
+    try {
+        const pending = await pendingBallots();
+        for (let i = 0; i < pending.length; i += maxBatch) {
+            const batch = pending.slice(i, i + maxBatch);
+            const response = await fetch(uploadUrl, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json', 'X-CSRFToken': csrfToken() },
+                body: JSON.stringify({ ballots: batch.map(b => ({ key: b.key, roles: b.roles })) }),
+            });
+            if (!response.ok) {
+                const data = await response.json().catch(() => ({}));
+                await showPending(data.error || `Upload failed (${response.status}); will retry.`);
+                return;
+            }
+            const result = await response.json();
+            // Rejected ballots can never succeed, so they leave the queue too
+            const done = [...result.accepted, ...result.duplicate, ...Object.keys(result.rejected)];
+            await withStore('readwrite', store => done.forEach(key => store.delete(key)));
+            const rejected = Object.keys(result.rejected).length;
+            await showPending(rejected
+                ? `${rejected} ballot(s) were rejected: ${Object.values(result.rejected)[0]}`
+                : `Last upload: ${new Date().toLocaleTimeString()}`);
+        }
+        await showPending();
+    } catch (err) {
+        await showPending('Offline; ballots will upload when the connection returns.');
+    } finally {
+        uploading = false;
+    }
+}
+
+form.addEventListener('submit', async event => {
+    event.preventDefault();
+    const checked = Array.from(form.querySelectorAll('input[type=radio]:checked'));
+    const groups = new Set(Array.from(form.querySelectorAll('input[type=radio]'), input => input.name));
+    document.getElementById('kiosk-incomplete').classList.toggle('d-none', checked.length === groups.size);
+    if (checked.length !== groups.size) return;
+
+    const ballot = {
+        key: newKey(),
+        session: sessionCode,
+        roles: checked.map(input => parseInt(input.value, 10)),
+        queuedAt: Date.now(),
+    };
+    await withStore('readwrite', store => store.put(ballot));
+    form.reset();
+    form.classList.add('d-none');
+    document.getElementById('kiosk-thanks').classList.remove('d-none');
+    window.scrollTo(0, 0);
+    setTimeout(() => {
+        document.getElementById('kiosk-thanks').classList.add('d-none');
+        form.classList.remove('d-none');
+    }, THANKS_MS);
+    await showPending();
+    upload();
+});
+
+document.getElementById('kiosk-upload').addEventListener('click', upload);
+window.addEventListener('online', upload);
+setInterval(upload, UPLOAD_INTERVAL_MS);
+showPending().then(upload);
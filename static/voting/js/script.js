@@ -1,6 +1,35 @@
 // ToastyVotes JavaScript
 
+// Service worker: offline timer and instant repeat visits
+if ('serviceWorker' in navigator && document.body.dataset.serviceWorker) {
+    window.addEventListener('load', function() {
+        navigator.serviceWorker.register(document.body.dataset.serviceWorker).catch(function(error) {
+            console.error('Service worker registration failed:', error);
+        });
+    });
+}
+
+// Pages the service worker stores carry no CSRF token of their own (it
+// changes at login); forms and scripts on them read the cookie when they post
+function csrfToken() {
+    const match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]*)/);
+    return match ? decodeURIComponent(match[1]) : '';
+}
+
 document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('form[data-csrf-cookie]').forEach(form => {
+        form.addEventListener('submit', function() {
+            let field = form.querySelector('[name=csrfmiddlewaretoken]');
+            if (!field) {
+                field = document.createElement('input');
+                field.type = 'hidden';
+                field.name = 'csrfmiddlewaretoken';
+                form.appendChild(field);
+            }
+            field.value = csrfToken();
+        });
+    });
+
     // Custom radio button handling for voting form
     const customRadios = document.querySelectorAll('.custom-radio');
     
@@ -66,7 +95,7 @@ document.addEventListener('DOMContentLoaded', function() {
             })
             .then(response => response.json())
             .then(data => {
-                if (data.success) {
+                if (data.success || data.polls_closed) {
                     window.location.href = this.dataset.redirect;
                 }
             })
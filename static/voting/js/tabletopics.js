@@ -0,0 +1,73 @@
+// ToastyVotes Table Topics Master
+
+const PLACEHOLDER_TEXT = 'Ready to speak?';
+const topicInput = document.getElementById('topic-input');
+const generateBtn = document.getElementById('btn-generate');
+const questionTextEl = document.getElementById('question-text');
+const topicBadgeEl = document.getElementById('topic-badge');
+const generateUrl = document.querySelector('.tt-container').dataset.generateUrl;
+
+async function generateQuestion() {
+    const topic = topicInput.value.trim();
+    if (!topic) {
+        topicInput.focus();
+        topicInput.style.borderColor = '#CD202C';
+        setTimeout(() => { topicInput.style.borderColor = '#ddd'; }, 1500);
+        return;
+    }
+
+    // Show loading state
+    generateBtn.disabled = true;
+    generateBtn.textContent = 'Generating...';
+    topicBadgeEl.style.visibility = 'hidden';
+    questionTextEl.classList.remove('fade-in');
+    questionTextEl.innerHTML = '<span class="spinner"></span>';
+    questionTextEl.classList.add('fade-in');
+
+    try {
+        const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]').value;
+
+        const response = await fetch(generateUrl, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrfToken,
+            },
+            body: JSON.stringify({ topic: topic }),
+        });
+
+        const data = await response.json();
+
+        if (!response.ok) {
+            throw new Error(data.error || 'Something went wrong.');
+        }
+
+        // Display the AI-generated question
+        topicBadgeEl.textContent = data.topic;
+        topicBadgeEl.style.visibility = 'visible';
+        questionTextEl.classList.remove('fade-in');
+        void questionTextEl.offsetWidth;
+        questionTextEl.textContent = data.question;
+        questionTextEl.classList.add('fade-in');
+
+    } catch (err) {
+        topicBadgeEl.style.visibility = 'hidden';
+        questionTextEl.classList.remove('fade-in');
+        void questionTextEl.offsetWidth;
+        questionTextEl.innerHTML = `<span class="error-msg">${err.message}</span>`;
+        questionTextEl.classList.add('fade-in');
+    } finally {
+        generateBtn.disabled = false;
+        generateBtn.textContent = 'Generate Question';
+    }
+}
+
+generateBtn.addEventListener('click', generateQuestion);
+
+// Allow Enter key to trigger generation
+topicInput.addEventListener('keydown', (e) => {
+    if (e.key === 'Enter') {
+        e.preventDefault();
+        generateQuestion();
+    }
+});
@@ -0,0 +1,258 @@
+// ToastyVotes speech timer
+
+const COLOR_WHITE = [255, 255, 255];
+const COLOR_GREEN = [0, 200, 0];
+const COLOR_YELLOW = [255, 230, 0];
+const COLOR_RED = [255, 0, 0];
+const COLOR_BLACK = [0, 0, 0];
+
+let lowSec, midSec, highSec;
+let startTime;
+let animationFrameId;
+let currentSpeechType = 'Custom';
+let stoppedElapsed = 0;
+let speakerLog = [];
+
+// Function to handle preset buttons
+function setPreset(low, mid, high, speechType) {
+    document.getElementById('low-time').value = low;
+    document.getElementById('mid-time').value = mid;
+    document.getElementById('high-time').value = high;
+    currentSpeechType = speechType || 'Custom';
+}
+
+function parseTimeToSeconds(timeStr) {
+    const parts = timeStr.split(':');
+    if (parts.length !== 2) return 0;
+    return (parseInt(parts[0], 10) * 60) + parseInt(parts[1], 10);
+}
+
+function formatTime(totalSeconds) {
+    const m = Math.floor(totalSeconds / 60);
+    const s = Math.floor(totalSeconds % 60);
+    return `${m.toString().padStart(2, '0')}:${s.toString().padStart(2, '0')}`;
+}
+
+function interpolateColor(color1, color2, factor) {
+    const r = Math.round(color1[0] + factor * (color2[0] - color1[0]));
+    const g = Math.round(color1[1] + factor * (color2[1] - color1[1]));
+    const b = Math.round(color1[2] + factor * (color2[2] - color1[2]));
+    return `rgb(${r}, ${g}, ${b})`;
+}
+
+function getTimerStatus(elapsed) {
+    if (elapsed < lowSec) return { label: 'Under Time', cssClass: 'status-green' };
+    if (elapsed < midSec) return { label: 'Green', cssClass: 'status-green' };
+    if (elapsed < highSec) return { label: 'Yellow', cssClass: 'status-yellow' };
+    if (elapsed < highSec + 30) return { label: 'Red', cssClass: 'status-red' };
+    return { label: 'Overtime', cssClass: 'status-overtime' };
+}
+
+function startTimer() {
+    // Read inputs
+    lowSec = parseTimeToSeconds(document.getElementById('low-time').value);
+    midSec = parseTimeToSeconds(document.getElementById('mid-time').value);
+    highSec = parseTimeToSeconds(document.getElementById('high-time').value);
+
+    if (lowSec >= midSec || midSec >= highSec) {
+        alert("Please ensure Low < Mid < High times.");
+        return;
+    }
+
+    document.getElementById('setup-screen').style.display = 'none';
+    document.getElementById('speaker-log').style.display = 'none';
+    const timerScreen = document.getElementById('timer-screen');
+    timerScreen.style.display = 'flex';
+
+    if (document.documentElement.requestFullscreen) {
+        document.documentElement.requestFullscreen().catch((e) => console.log("Fullscreen ignored:", e));
+    }
+
+    startTime = Date.now();
+    updateTimer();
+}
+
+function stopTimer() {
+    cancelAnimationFrame(animationFrameId);
+    stoppedElapsed = (Date.now() - startTime) / 1000;
+
+    // Exit fullscreen
+    if (document.exitFullscreen) {
+        document.exitFullscreen().catch(() => {});
+    }
+
+    // Hide timer screen
+    document.getElementById('timer-screen').style.display = 'none';
+    document.getElementById('timer-display').classList.remove('overtime-text');
+    document.getElementById('timer-screen').style.backgroundColor = 'rgb(255, 255, 255)';
+
+    // Show name modal
+    const status = getTimerStatus(stoppedElapsed);
+    document.getElementById('modal-summary').innerHTML = 
+        `<strong>${currentSpeechType}</strong> &mdash; ${formatTime(stoppedElapsed)} &mdash; <span class="${status.cssClass}">${status.label}</span>`;
+    document.getElementById('speaker-name').value = '';
+    const modal = document.getElementById('name-modal');
+    modal.style.display = 'flex';
+
+    // Focus the name input after a brief delay (fullscreen exit takes a moment)
+    setTimeout(() => document.getElementById('speaker-name').focus(), 100);
+}
+
+function saveEntry() {
+    const name = document.getElementById('speaker-name').value.trim() || 'Unknown';
+    const status = getTimerStatus(stoppedElapsed);
+
+    speakerLog.push({
+        name: name,
+        speechType: currentSpeechType,
+        time: formatTime(stoppedElapsed),
+        seconds: Math.floor(stoppedElapsed),
+        status: status.label,
+        statusClass: status.cssClass
+    });
+
+    document.getElementById('name-modal').style.display = 'none';
+    renderLog();
+    showSetupScreen();
+}
+
+function skipEntry() {
+    document.getElementById('name-modal').style.display = 'none';
+    showSetupScreen();
+}
+
+function showSetupScreen() {
+    document.getElementById('setup-screen').style.display = 'block';
+    document.getElementById('speaker-log').style.display = 'block';
+}
+
+function renderLog() {
+    const logContent = document.getElementById('log-content');
+    const logActions = document.getElementById('log-actions');
+
+    if (speakerLog.length === 0) {
+        logContent.innerHTML = '<p class="log-empty">No speakers recorded yet. Start a timer and press Stop to log a speaker.</p>';
+        logActions.style.display = 'none';
+        return;
+    }
+
+    let html = '<table class="log-table"><thead><tr>';
+    html += '<th>#</th><th>Name</th><th>Speech Type</th><th>Time</th><th>Status</th>';
+    html += '</tr></thead><tbody>';
+
+    speakerLog.forEach((entry, i) => {
+        html += `<tr>`;
+        html += `<td>${i + 1}</td>`;
+        html += `<td>${escapeHtml(entry.name)}</td>`;
+        html += `<td>${escapeHtml(entry.speechType)}</td>`;
+        html += `<td>${entry.time}</td>`;
+        html += `<td class="${entry.statusClass}">${entry.status}</td>`;
+        html += `</tr>`;
+    });
+
+    html += '</tbody></table>';
+    logContent.innerHTML = html;
+    logActions.style.display = 'flex';
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+function downloadCSV() {
+    if (speakerLog.length === 0) return;
+
+    let csv = '#,Name,Speech Type,Time,Status\n';
+    speakerLog.forEach((entry, i) => {
+        csv += `${i + 1},"${entry.name}","${entry.speechType}",${entry.time},${entry.status}\n`;
+    });
+
+    const blob = new Blob([csv], { type: 'text/csv' });
+    const url = URL.createObjectURL(blob);
+    const a = document.createElement('a');
+    const date = new Date().toISOString().slice(0, 10);
+    a.href = url;
+    a.download = `toastyvotes-timer-log-${date}.csv`;
+    a.click();
+    URL.revokeObjectURL(url);
+}
+
+function clearLog() {
+    if (speakerLog.length > 0 && !confirm('Clear all logged speakers?')) return;
+    speakerLog = [];
+    renderLog();
+}
+
+function updateTimer() {
+    const now = Date.now();
+    const elapsed = (now - startTime) / 1000;
+    const displayStr = formatTime(elapsed);
+
+    const displayEl = document.getElementById('timer-display');
+    displayEl.textContent = displayStr;
+
+    // Determine Background Color
+    let bgColor = `rgb(255, 255, 255)`;
+    const transitionTime = 3; // Number of seconds to fade
+
+    if (elapsed < lowSec - transitionTime) {
+        bgColor = `rgb(255, 255, 255)`;
+    } 
+    else if (elapsed < lowSec) {
+        const factor = (elapsed - (lowSec - transitionTime)) / transitionTime;
+        bgColor = interpolateColor(COLOR_WHITE, COLOR_GREEN, factor);
+    } 
+    else if (elapsed < midSec - transitionTime) {
+        bgColor = `rgb(0, 200, 0)`;
+    } 
+    else if (elapsed < midSec) {
+        const factor = (elapsed - (midSec - transitionTime)) / transitionTime;
+        bgColor = interpolateColor(COLOR_GREEN, COLOR_YELLOW, factor);
+    } 
+    else if (elapsed < highSec - transitionTime) {
+        bgColor = `rgb(255, 230, 0)`;
+    } 
+    else if (elapsed < highSec) {
+        const factor = (elapsed - (highSec - transitionTime)) / transitionTime;
+        bgColor = interpolateColor(COLOR_YELLOW, COLOR_RED, factor);
+    } 
+    else if (elapsed < highSec + 30) {
+        const factor = (elapsed - highSec) / 30;
+        bgColor = interpolateColor(COLOR_RED, COLOR_BLACK, factor);
+    } 
+    else {
+        bgColor = `rgb(0, 0, 0)`;
+        displayEl.classList.add('overtime-text');
+    }
+
+    document.getElementById('timer-screen').style.backgroundColor = bgColor;
+
+    animationFrameId = requestAnimationFrame(updateTimer);
+}
+
+// Keyboard shortcuts
+document.addEventListener('keydown', function(e) {
+    // Escape stops the timer (same as Stop button)
+    if (e.key === 'Escape') {
+        const timerScreen = document.getElementById('timer-screen');
+        if (timerScreen.style.display === 'flex') {
+            stopTimer();
+            return;
+        }
+        // If modal is open, skip the entry
+        const modal = document.getElementById('name-modal');
+        if (modal.style.display === 'flex') {
+            skipEntry();
+            return;
+        }
+    }
+    // Enter saves entry when modal is open
+    if (e.key === 'Enter') {
+        const modal = document.getElementById('name-modal');
+        if (modal.style.display === 'flex') {
+            saveEntry();
+        }
+    }
+});
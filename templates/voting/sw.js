@@ -0,0 +1,156 @@
+// ToastyVotes service worker
+//
+// - App shell (bundles, page assets, icons) and the timer page are precached.
+// - Hashed static files are cache-first: their names change with their content.
+//   Unhashed ones (DEBUG) are stale-while-revalidate so edits still show up.
+// - The timer and home pages are stale-while-revalidate.
+// - Vote and results pages are network-first, falling back to the last copy
+//   when the network is slower than {{ network_timeout }} ms or unavailable.
+// - Only pages carrying the X-SW-Scope header are stored (never ones with a
+//   CSRF token), and only served back to the same login session. A response
+//   with another scope, a posted form (login) or the logout link clears them
+//   (see voting/offline.py).
+
+const VERSION = '{{ version }}';
+const SHELL_CACHE = `toastyvotes-shell-${VERSION}`;
+const PAGE_CACHE = `toastyvotes-pages-${VERSION}`;
+const SCOPE_HEADER = 'X-SW-Scope';
+const LOGOUT_URL = '{{ logout_url }}';
+const PRECACHE_URLS = {{ precache_urls|safe }};
+const STATIC_URL = '{{ static_url }}';
+const HASHED_NAME = /\.[0-9a-f]{12}\.[^/.]+$/;
+const STALE_WHILE_REVALIDATE = {{ stale_while_revalidate|safe }};
+const NETWORK_FIRST = {{ network_first|safe }};
+const NETWORK_TIMEOUT = {{ network_timeout }};
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(SHELL_CACHE)
+            .then(cache => cache.addAll(PRECACHE_URLS))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(
+                keys.filter(key => key.startsWith('toastyvotes-') && key !== SHELL_CACHE && key !== PAGE_CACHE)
+                    .map(key => caches.delete(key))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+function isCacheable(response) {
+    return response && response.ok && response.type === 'basic' && !response.redirected;
+}
+
+async function cacheFirst(request) {
+    const cached = await caches.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (isCacheable(response)) {
+        const cache = await caches.open(SHELL_CACHE);
+        cache.put(request, response.clone());
+    }
+    return response;
+}
+
+// Scope of the last page response seen; null until one arrives, and after
+// anything that may have logged someone in or out
+let scope = null;
+
+async function forgetPages() {
+    scope = null;
+    await caches.delete(PAGE_CACHE);
+}
+
+// Fetch a page and store it if its scope allows
+async function fetchPage(request) {
+    const response = await fetch(request);
+    const responseScope = response.headers.get(SCOPE_HEADER);
+    if (response.ok && responseScope !== null) {
+        if (scope !== null && responseScope !== scope) await caches.delete(PAGE_CACHE);
+        scope = responseScope;
+    }
+    if (isCacheable(response) && responseScope !== null) {
+        const cache = await caches.open(PAGE_CACHE);
+        await cache.put(request, response.clone());
+    }
+    return response;
+}
+
+// A stored page, if it was rendered for the current scope (or any scope when
+// the scope is unknown and the network has already failed)
+async function cachedPage(request, anyScope = false) {
+    const cache = await caches.open(PAGE_CACHE);
+    const cached = await cache.match(request);
+    if (cached && (anyScope || (scope !== null && cached.headers.get(SCOPE_HEADER) === scope))) return cached;
+    return null;
+}
+
+async function staleWhileRevalidate(event) {
+    const cached = await cachedPage(event.request);
+    const refresh = fetchPage(event.request);
+    if (cached) {
+        event.waitUntil(refresh.catch(() => {}));
+        return cached;
+    }
+    try {
+        return await refresh;
+    } catch (err) {
+        // Offline: the last stored copy, then the precached one (timer)
+        const fallback = await cachedPage(event.request, scope === null) || await caches.match(event.request);
+        if (fallback) return fallback;
+        throw err;
+    }
+}
+
+async function staticStaleWhileRevalidate(event) {
+    const cache = await caches.open(SHELL_CACHE);
+    const cached = await cache.match(event.request);
+    const refresh = fetch(event.request).then(response => {
+        if (isCacheable(response)) cache.put(event.request, response.clone());
+        return response;
+    });
+    if (cached) {
+        event.waitUntil(refresh.catch(() => {}));
+        return cached;
+    }
+    return refresh;
+}
+
+async function networkFirst(request) {
+    const network = fetchPage(request);
+    const timeout = new Promise(resolve => setTimeout(resolve, NETWORK_TIMEOUT));
+
+    try {
+        const response = await Promise.race([network, timeout]);
+        if (response) return response;
+    } catch (err) {
+        // Offline: fall through to the cached copy
+        return await cachedPage(request, scope === null) || network;
+    }
+    return await cachedPage(request) || network;
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) return;
+    if (request.method !== 'GET' || url.pathname === LOGOUT_URL) {
+        // Logins and logouts are posts or the logout link; wait for the
+        // cleanup so the page they redirect to is never a stored one
+        if (request.mode === 'navigate') event.respondWith(forgetPages().then(() => fetch(request)));
+        return;
+    }
+
+    if (url.pathname.startsWith(STATIC_URL)) {
+        event.respondWith(HASHED_NAME.test(url.pathname) ? cacheFirst(request) : staticStaleWhileRevalidate(event));
+    } else if (STALE_WHILE_REVALIDATE.includes(url.pathname)) {
+        event.respondWith(staleWhileRevalidate(event));
+    } else if (NETWORK_FIRST.some(prefix => url.pathname.startsWith(prefix))) {
+        event.respondWith(networkFirst(request));
+    }
+});
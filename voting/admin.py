@@ -1,5 +1,15 @@
-from django.contrib import admin
-from .models import VoteSession, Role, Vote, AdminProfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from . import members
+from .models import VoteSession, Role, Vote, Ballot, AdminProfile, GeneratedQuestion, Job
 
 
 @admin.register(VoteSession)
@@ -16,6 +26,23 @@ class RoleAdmin(admin.ModelAdmin):
     list_filter = ('role_type', 'vote_session')
     search_fields = ('name', 'vote_session__code')
 
+    # Packed ballots refer to roles by category and position (see Role.in_packed_ballots)
+    def get_readonly_fields(self, request, obj=None):
+        if obj is not None and obj.in_packed_ballots():
+            return Role.BALLOT_KEY_FIELDS
+        return super().get_readonly_fields(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        if obj is not None and obj.in_packed_ballots():
+            return False
+        return super().has_delete_permission(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        kept = queryset.filter(vote_session__ballots__isnull=False).distinct()
+        if kept.exists():
+            messages.warning(request, f'Kept {kept.count()} role(s) of sessions that already have ballots.')
+        super().delete_queryset(request, queryset.exclude(pk__in=kept.values('pk')))
+
 
 @admin.register(Vote)
 class VoteAdmin(admin.ModelAdmin):
@@ -25,8 +52,91 @@ class VoteAdmin(admin.ModelAdmin):
     date_hierarchy = 'timestamp'
 
 
+@admin.register(Ballot)
+class BallotAdmin(admin.ModelAdmin):
+    list_display = ('user', 'vote_session', 'choices_display', 'cast_at')
+    list_filter = ('vote_session', 'cast_at')
+    search_fields = ('user__username', 'vote_session__code')
+    date_hierarchy = 'cast_at'
+    list_select_related = ('user', 'vote_session')
+
+    @admin.display(description='Choices')
+    def choices_display(self, obj):
+        labels = dict(Role.ROLE_TYPES)
+        return ', '.join(f'{labels[role_type]} #{position}' for role_type, position in Ballot.unpack(obj.choices).items())
+
+
+class MemberImportForm(forms.Form):
+    csv_file = forms.FileField(
+        label='Members CSV',
+        help_text='Header row with username and optionally email, first_name, last_name, password, admin.',
+    )
+
+
 @admin.register(AdminProfile)
 class AdminProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'is_platform_admin')
     list_filter = ('is_platform_admin',)
     search_fields = ('user__username', 'user__email')
+    change_list_template = 'admin/voting/adminprofile/change_list.html'
+
+    # Hashing threads for uploads: no forking inside a web worker, and
+    # PBKDF2 releases the GIL so threads still use every core
+    IMPORT_WORKERS = 4
+
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_members), name='voting_adminprofile_import'),
+        ] + super().get_urls()
+
+    def import_members(self, request):
+        """View for creating members in bulk from an uploaded CSV"""
+        if not (self.has_add_permission(request) and request.user.has_perm('auth.add_user')):
+            raise PermissionDenied
+        form = MemberImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            try:
+                text = form.cleaned_data['csv_file'].read().decode('utf-8-sig')
+            except UnicodeDecodeError:
+                form.add_error('csv_file', 'The file must be UTF-8 text.')
+            else:
+                rows, errors = members.parse_members(text)
+                for line_number, error in errors:
+                    form.add_error('csv_file', f'Line {line_number}: {error}')
+                passwords = sum(row['password'] is not None for row in rows)
+                if passwords > settings.MEMBER_IMPORT_MAX_PASSWORDS:
+                    form.add_error('csv_file', (
+                        f'This file sets {passwords} passwords; one upload can hash at most '
+                        f'{settings.MEMBER_IMPORT_MAX_PASSWORDS}. Split it, or run "manage.py import_members".'
+                    ))
+                elif not errors:
+                    result = members.import_members(rows, self.IMPORT_WORKERS, ThreadPoolExecutor)
+                    elapsed = result['hash_seconds'] + result['insert_seconds']
+                    self.message_user(request, (
+                        f'Created {result["created"]} member(s) in {elapsed:.1f}s, '
+                        f'skipped {len(result["skipped"])} existing username(s).'
+                    ), messages.SUCCESS)
+                    return redirect('admin:voting_adminprofile_changelist')
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Import members',
+            'form': form,
+            'max_passwords': settings.MEMBER_IMPORT_MAX_PASSWORDS,
+            'opts': self.model._meta,
+        }
+        return TemplateResponse(request, 'admin/voting/adminprofile/import_members.html', context)
+
+
+@admin.register(GeneratedQuestion)
+class GeneratedQuestionAdmin(admin.ModelAdmin):
+    list_display = ('text', 'topic', 'created_at')
+    search_fields = ('text', 'topic')
+    date_hierarchy = 'created_at'
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'run_at', 'attempts', 'max_attempts', 'locked_by', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'dedupe_key')
+    readonly_fields = ('last_error', 'locked_by', 'locked_at', 'created_at', 'finished_at')
@@ -0,0 +1,177 @@
+"""
+JSON API for room displays and custom clients (``/api/v1/``).
+
+Responses are built from ``values()`` rows; nothing is rendered from a
+template and no message or session cookie is touched. Queries per request,
+as measured by "manage.py bench_api" (logged-in callers add 2 for the
+session and user lookups):
+
+- ``GET sessions/<code>/``: 2 (session, roles), plus up to 3 for ``has_voted``
+  when logged in
+- ``GET sessions/<code>/results/``: 1 on a tally cache hit (login required)
+- ``POST sessions/<code>/ballot/``: 17 with a token and row storage, most
+  of them the per-row Vote checks and cache signals of ``storage.cast``
+
+Ballots are submitted as ``{"roles": [role ids]}`` by a logged-in user (with
+the usual CSRF header) or as ``{"token": "...", "roles": [...]}`` with a
+ballot code from "Guest Ballot Codes" (no login, no CSRF).
+"""
+import json
+
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from . import storage
+from .models import BallotToken, Role, VoteSession
+from .ratelimit import rate_limit
+from .routers import replica_reads
+from .views import cached_tally
+
+SESSION_FIELDS = ('id', 'code', 'title', 'expires_at', 'polls_closed', 'show_results', 'state_version', 'created_by_id')
+ROLE_FIELDS = ('id', 'role_type', 'name', 'position')
+
+
+def _session_or_404(code, fields=SESSION_FIELDS):
+    vote_session = VoteSession.objects.filter(code=code).values(*fields).first()
+    if vote_session is None:
+        return None, JsonResponse({'error': 'Session not found.'}, status=404)
+    return vote_session, None
+
+
+def _status(vote_session):
+    if vote_session['polls_closed']:
+        return 'closed'
+    if timezone.now() > vote_session['expires_at']:
+        return 'expired'
+    return 'open'
+
+
+def _is_owner(request, vote_session):
+    user = request.user
+    return (
+        user.is_authenticated
+        and user.pk == vote_session['created_by_id']
+        and hasattr(user, 'admin_profile') and user.admin_profile.is_platform_admin
+    )
+
+
+@require_GET
+@replica_reads
+def session_detail(request, code):
+    """Session status and ballot schema"""
+    vote_session, error = _session_or_404(code)
+    if error:
+        return error
+
+    labels = dict(Role.ROLE_TYPES)
+    categories = {}
+    for role in Role.objects.filter(vote_session_id=vote_session['id']).values(*ROLE_FIELDS):
+        category = categories.setdefault(role['role_type'], {
+            'role_type': role['role_type'], 'label': labels[role['role_type']], 'roles': [],
+        })
+        category['roles'].append({'id': role['id'], 'name': role['name'], 'position': role['position']})
+
+    data = {
+        'code': vote_session['code'],
+        'title': vote_session['title'],
+        'status': _status(vote_session),
+        'expires_at': vote_session['expires_at'],
+        'show_results': vote_session['show_results'],
+        'version': vote_session['state_version'],
+        'categories': [categories[role_type] for role_type, _ in Role.ROLE_TYPES if role_type in categories],
+    }
+    if request.user.is_authenticated:
+        data['has_voted'] = storage.has_voted(request.user, vote_session['id'])
+    return JsonResponse(data)
+
+
+@require_GET
+@replica_reads
+def session_results(request, code):
+    """
+    Tallied results, once polls are closed (or any time for the session
+    owner). As on the results page, only the owner sees every participant's
+    count; other users get the winners' counts.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Log in to see results.'}, status=401)
+    vote_session, error = _session_or_404(code)
+    if error:
+        return error
+    is_owner = _is_owner(request, vote_session)
+    if not vote_session['polls_closed'] and not is_owner:
+        return JsonResponse({'error': 'Results are available once polls close.'}, status=403)
+
+    # cached_tally only needs the primary key
+    tally = cached_tally(VoteSession(pk=vote_session['id']))
+    counted = 'votes' if is_owner else 'winning_votes'
+    return JsonResponse({
+        'code': vote_session['code'],
+        'status': _status(vote_session),
+        'version': vote_session['state_version'],
+        'results': [
+            {
+                'role_type': role_type,
+                'label': result['type_display'],
+                'winners': result['winners'],
+                'votes': [{'name': vote['role__name'], 'count': vote['count']} for vote in result[counted]],
+            }
+            for role_type, result in tally.items()
+        ],
+    })
+
+
+@csrf_exempt
+@require_POST
+@rate_limit('ballot_token')
+def submit_ballot(request, code):
+    """Cast a ballot as the logged-in user or with a ballot token"""
+    try:
+        body = json.loads(request.body)
+        token, role_ids = body.get('token'), body['roles']
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return JsonResponse({'error': 'Expected {"roles": [...]} and optionally "token".'}, status=400)
+
+    vote_session = VoteSession.objects.filter(code=code).first()
+    if vote_session is None:
+        return JsonResponse({'error': 'Session not found.'}, status=404)
+    if vote_session.polls_closed or vote_session.is_expired():
+        return JsonResponse({'error': 'Voting has ended for this session.'}, status=409)
+
+    ballot_token = None
+    if token is not None:
+        ballot_token = BallotToken.objects.lookup(vote_session, str(token))
+        if ballot_token is None:
+            return JsonResponse({'error': 'Invalid ballot token.'}, status=403)
+        voter = ballot_token.user
+    elif request.user.is_authenticated:
+        # Cookie-authenticated requests still need the CSRF header
+        rejected = CsrfViewMiddleware(lambda request: None).process_view(request, None, (), {})
+        if rejected is not None:
+            return JsonResponse({'error': 'CSRF check failed.'}, status=403)
+        voter = request.user
+    else:
+        return JsonResponse({'error': 'Log in or provide a ballot token.'}, status=401)
+
+    roles, error = storage.choose_roles({role.pk: role for role in vote_session.roles.all()}, role_ids)
+    if error:
+        return JsonResponse({'error': error}, status=400)
+
+    try:
+        if ballot_token is not None:
+            with transaction.atomic():
+                recorded = ballot_token.mark_used()
+                if recorded:
+                    storage.cast(voter, vote_session, roles)
+        else:
+            recorded = storage.cast_once(voter, vote_session, roles)
+    except IntegrityError:
+        # A concurrent submission by the same voter won
+        recorded = False
+    if not recorded:
+        return JsonResponse({'error': 'This ballot has already been cast.'}, status=409)
+    return JsonResponse({'status': 'recorded'}, status=201)
@@ -0,0 +1,79 @@
+"""
+Helpers shared by the ``bench_*`` management commands.
+"""
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from .models import AdminProfile, Role, Vote, VoteSession
+
+
+def allow_test_client():
+    """Settings override letting django.test.Client requests through host validation"""
+    return override_settings(ALLOWED_HOSTS=['testserver'])
+
+
+@contextmanager
+def isolated_cache():
+    """
+    Point the default cache at a throwaway copy of the configured backend.
+
+    Benchmarks roll their data back, so primary keys get reused later; entries
+    cached for them must not outlive the run.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        config = dict(settings.CACHES['default'], LOCATION=str(Path(directory) / 'cache.sqlite3'))
+        with override_settings(CACHES={'default': config}):
+            yield
+
+
+@contextmanager
+def scratch_databases():
+    """
+    Run against freshly migrated test databases, destroyed afterwards.
+
+    Benchmarks write thousands of rows; doing that in one long transaction on
+    the live database would hold its write lock for the whole run. SQLite test
+    databases go in a temporary file rather than memory so timings include
+    the disk.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        for connection in connections.all():
+            test = connection.settings_dict['TEST']
+            if connection.vendor == 'sqlite' and not test.get('NAME') and not test.get('MIRROR'):
+                test['NAME'] = str(Path(directory) / f'{connection.alias}.sqlite3')
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            yield
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+
+def create_session(admin, title='Benchmark'):
+    """A session with three participants in every category; roles are ordered by category, then position"""
+    vote_session = VoteSession.objects.create(title=title, created_by=admin)
+    roles = Role.objects.bulk_create(
+        Role(vote_session=vote_session, role_type=role_type, position=position, name=f'{label} {position}')
+        for role_type, label in Role.ROLE_TYPES
+        for position in (1, 2, 3)
+    )
+    return vote_session, roles
+
+
+def sample_session(voters):
+    """A platform admin's session with `voters` ballots spread over its participants"""
+    admin = User.objects.create_user('bench-admin')
+    AdminProfile.objects.create(user=admin, is_platform_admin=True)
+    vote_session, roles = create_session(admin)
+    for i in range(voters):
+        voter = User.objects.create_user(f'bench-voter-{i}')
+        Vote.objects.bulk_create(
+            Vote(user=voter, vote_session=vote_session, role=roles[3 * t + i % 3])
+            for t in range(len(Role.ROLE_TYPES))
+        )
+    return admin, vote_session, roles
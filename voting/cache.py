@@ -0,0 +1,264 @@
+"""
+Cache backend shared by every worker process on the host.
+
+Entries live in a SQLite file, so gunicorn/Passenger workers see the same
+data without an external service. Entries can carry tags, and
+``invalidate_tags`` evicts every entry with a given tag in one statement,
+for example everything derived from one vote session.
+
+Reads go through a small per-process front cache. A generation counter in a
+memory-mapped file is bumped after every committed write that changed a row,
+so a front cache hit costs a dict lookup plus reading eight bytes and never
+returns data another worker has since replaced.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'voting.cache.SharedSQLiteCache',
+            'LOCATION': '/path/to/cache.sqlite3',
+            'OPTIONS': {'MAX_ENTRIES': 5000, 'FRONT_CACHE_SIZE': 512},
+        }
+    }
+"""
+import fcntl
+import mmap
+import os
+import pickle
+import random
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+GENERATION = struct.Struct('Q')
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS entry ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)',
+    'CREATE TABLE IF NOT EXISTS entry_tag ('
+    'tag TEXT NOT NULL, key TEXT NOT NULL REFERENCES entry (key) ON DELETE CASCADE, '
+    'PRIMARY KEY (tag, key)) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS entry_tag_key ON entry_tag (key)',
+    'CREATE INDEX IF NOT EXISTS entry_expires ON entry (expires)',
+)
+
+# Django creates a backend instance per thread; the front cache and the
+# generation counter are shared by every thread of a process, keyed by
+# LOCATION. A forked child must open its own file lock, so it starts afresh.
+_processes = {}
+_processes_lock = threading.Lock()
+os.register_at_fork(after_in_child=_processes.clear)
+
+
+class _ProcessState:
+    """Front cache and generation counter shared by the threads of one process"""
+
+    def __init__(self, path, front_size):
+        self.front = OrderedDict()
+        self.front_size = front_size
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.fd = os.open(path + '.generation', os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self.fd).st_size < GENERATION.size:
+            os.ftruncate(self.fd, GENERATION.size)
+        self.generation_map = mmap.mmap(self.fd, GENERATION.size)
+
+    def generation(self):
+        return GENERATION.unpack_from(self.generation_map)[0]
+
+
+class SharedSQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = str(location)
+        self._front_size = int(params.get('OPTIONS', {}).get('FRONT_CACHE_SIZE', 256))
+        self._conn = None
+        self._conn_pid = None
+
+    # Storage
+
+    def _state(self):
+        state = _processes.get(self._path)
+        if state is None:
+            with _processes_lock:
+                state = _processes.get(self._path)
+                if state is None:
+                    state = _processes[self._path] = _ProcessState(self._path, self._front_size)
+        return state
+
+    def _connection(self):
+        """Return this instance's connection to the cache file, reopening it after a fork"""
+        if self._conn is None or self._conn_pid != os.getpid():
+            conn = sqlite3.connect(self._path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            conn.execute('PRAGMA mmap_size=67108864')
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._conn, self._conn_pid = conn, os.getpid()
+        return self._conn
+
+    def _write(self, statements):
+        """Run ``(sql, params)`` statements in one transaction, then tell every process"""
+        conn = self._connection()
+        state = self._state()
+        # Writers are serialized across threads and processes so the counter
+        # only ever moves forward, and it moves after the commit: a reader
+        # that sees the new value is guaranteed to read the new data.
+        with state.write_lock:
+            fcntl.flock(state.fd, fcntl.LOCK_EX)
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    results = [conn.execute(sql, params) for sql, params in statements]
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+                # A write that changed nothing (evicting a tag with no
+                # entries, as most votes do) leaves every front cache valid
+                changed = any(cursor.rowcount for cursor in results)
+                if changed:
+                    GENERATION.pack_into(state.generation_map, 0, (state.generation() + 1) % 2 ** 64)
+            finally:
+                fcntl.flock(state.fd, fcntl.LOCK_UN)
+        if changed:
+            with state.lock:
+                state.front.clear()
+        return results
+
+    def _read(self, key):
+        """Return the pickled value stored under an already-made key, or None"""
+        state = self._state()
+        generation = state.generation()
+        with state.lock:
+            hit = state.front.get(key)
+            if hit is not None and hit[0] == generation:
+                if hit[2] is None or hit[2] > time.time():
+                    state.front.move_to_end(key)
+                    return hit[1]
+                del state.front[key]
+                return None
+
+        row = self._connection().execute('SELECT value, expires FROM entry WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        with state.lock:
+            state.front[key] = (generation, row[0], row[1])
+            state.front.move_to_end(key)
+            while len(state.front) > state.front_size:
+                state.front.popitem(last=False)
+        return row[0]
+
+    def _store_statements(self, key, value, timeout, tags, only_if_missing=False):
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        expires = self.get_backend_timeout(timeout)
+        if only_if_missing:
+            insert = ('INSERT INTO entry (key, value, expires) VALUES (?, ?, ?) '
+                      'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires '
+                      'WHERE entry.expires IS NOT NULL AND entry.expires <= ?')
+            params = (key, pickled, expires, time.time())
+        else:
+            insert = 'INSERT OR REPLACE INTO entry (key, value, expires) VALUES (?, ?, ?)'
+            params = (key, pickled, expires)
+        statements = [(insert, params)]
+        statements += [('INSERT OR IGNORE INTO entry_tag (tag, key) VALUES (?, ?)', (tag, key)) for tag in tags]
+        return statements
+
+    def _maybe_cull(self):
+        """Now and then drop expired entries and, past MAX_ENTRIES, the soonest to expire"""
+        if random.randrange(64):
+            return
+        self._write([('DELETE FROM entry WHERE expires IS NOT NULL AND expires <= ?', (time.time(),))])
+        count = self._connection().execute('SELECT COUNT(*) FROM entry').fetchone()[0]
+        if count > self._max_entries:
+            excess = count - self._max_entries + count // self._cull_frequency
+            self._write([('DELETE FROM entry WHERE key IN ('
+                          'SELECT key FROM entry ORDER BY expires IS NULL, expires LIMIT ?)', (excess,))])
+
+    # Cache API
+
+    def validate_key(self, key):
+        # Any string is a valid SQLite key; skipping the memcached-compatibility
+        # scan halves the cost of a front cache hit.
+        pass
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, tags=()):
+        key = self.make_and_validate_key(key, version=version)
+        if self._read(key) is not None:
+            return False
+        cursor = self._write(self._store_statements(key, value, timeout, tags, only_if_missing=True))[0]
+        self._maybe_cull()
+        return cursor.rowcount > 0
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        pickled = self._read(key)
+        return default if pickled is None else pickle.loads(pickled)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, tags=()):
+        """Store a value; ``tags`` lets ``invalidate_tags`` evict it later"""
+        key = self.make_and_validate_key(key, version=version)
+        statements = [('DELETE FROM entry_tag WHERE key = ?', (key,))]
+        self._write(statements + self._store_statements(key, value, timeout, tags))
+        self._maybe_cull()
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._write([(
+            'UPDATE entry SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time()),
+        )])[0]
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._write([('DELETE FROM entry WHERE key = ?', (key,))])[0].rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._read(key) is not None
+
+    def invalidate_tags(self, *tags):
+        """Evict every entry stored with any of ``tags``, in every process"""
+        placeholders = ', '.join('?' * len(tags))
+        cursor = self._write([(
+            f'DELETE FROM entry WHERE key IN (SELECT key FROM entry_tag WHERE tag IN ({placeholders}))',
+            tags,
+        )])[0]
+        return cursor.rowcount
+
+    def clear(self):
+        self._write([('DELETE FROM entry', ())])
+
+    def close(self, **kwargs):
+        # The connection is kept for the life of the thread, as in voting.ratelimit
+        pass
+
+
+def session_tag(session_id):
+    """Tag for cache entries derived from one vote session"""
+    return f'session:{session_id}'
+
+
+def set_tagged(key, value, timeout=DEFAULT_TIMEOUT, tags=()):
+    """
+    Store ``value`` in the default cache under ``tags``.
+
+    Backends without tag support cannot evict the entry when its source
+    changes, so nothing is stored there.
+    """
+    if hasattr(cache, 'invalidate_tags'):
+        cache.set(key, value, timeout, tags=tags)
+
+
+def invalidate_tags(*tags):
+    """Evict tagged entries from the default cache, if it supports tags"""
+    if hasattr(cache, 'invalidate_tags'):
+        cache.invalidate_tags(*tags)
@@ -0,0 +1,72 @@
+"""
+Streaming exports of session results and vote ledgers.
+
+Each export is a generator of encoded lines, so the same code feeds
+``StreamingHttpResponse`` and "manage.py export_votes" without ever holding
+more than one database chunk in memory.
+"""
+import csv
+import json
+
+from . import storage
+from .models import Role
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+LEDGER_FIELDS = ['session', 'voter', 'role_type', 'role', 'cast_at']
+RESULTS_FIELDS = ['session', 'title', 'role_type', 'role', 'votes', 'winner']
+
+
+class Echo:
+    """File-like object whose write() returns the line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def ledger_rows(vote_sessions, chunk_size=2000):
+    """Yield one dict per vote in `vote_sessions`"""
+    for vote_session in vote_sessions:
+        roles = {role.pk: role for role in Role.objects.filter(vote_session=vote_session)}
+        for username, role_id, cast_at in storage.iter_votes(vote_session, chunk_size=chunk_size):
+            role = roles[role_id]
+            yield {
+                'session': vote_session.code,
+                'voter': username,
+                'role_type': role.role_type,
+                'role': role.name,
+                'cast_at': cast_at.isoformat(),
+            }
+
+
+def results_rows(vote_sessions):
+    """Yield one dict per role that received votes in `vote_sessions`"""
+    # Imported here: views imports this module
+    from .views import cached_tally
+
+    for vote_session in vote_sessions:
+        for role_type, result in cached_tally(vote_session).items():
+            for vote in result['votes']:
+                yield {
+                    'session': vote_session.code,
+                    'title': vote_session.title,
+                    'role_type': role_type,
+                    'role': vote['role__name'],
+                    'votes': vote['count'],
+                    'winner': vote['role__name'] in result['winners'],
+                }
+
+
+def encode(rows, fields, fmt):
+    """Turn dicts from `rows` into lines of CSV (with a header) or NDJSON"""
+    if fmt == 'csv':
+        writer = csv.DictWriter(Echo(), fieldnames=fields)
+        yield writer.writeheader()
+        for row in rows:
+            yield writer.writerow(row)
+    else:
+        for row in rows:
+            yield json.dumps(row) + '\n'
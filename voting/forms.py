@@ -1,3 +1,6 @@
+import csv
+import io
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
@@ -34,6 +37,88 @@ class VoteSessionForm(forms.ModelForm):
         }
 
 
+class RosterImportForm(forms.Form):
+    """Form for importing participants from pasted or uploaded CSV, one "category,name" per line"""
+
+    # Accepted spellings of each category, compared case-insensitively
+    CATEGORY_ALIASES = {
+        'speaker': 'SPEAKER',
+        'speakers': 'SPEAKER',
+        'prepared speaker': 'SPEAKER',
+        'evaluator': 'EVALUATOR',
+        'evaluators': 'EVALUATOR',
+        'table topics': 'TABLE_TOPICS',
+        'table_topics': 'TABLE_TOPICS',
+        'table topics speaker': 'TABLE_TOPICS',
+        'tabletopics': 'TABLE_TOPICS',
+    }
+    MAX_FILE_SIZE = 1024 * 1024
+
+    roster = forms.CharField(
+        required=False,
+        label='Paste a roster',
+        widget=forms.Textarea(attrs={
+            'class': 'form-control', 'rows': 6,
+            'placeholder': 'Speaker, Jane Doe\nEvaluator, John Smith\nTable Topics, Ana Lopez',
+        }),
+    )
+    roster_file = forms.FileField(
+        required=False,
+        label='Or upload a CSV file',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,text/csv,text/plain'}),
+    )
+
+    def clean_roster_file(self):
+        upload = self.cleaned_data['roster_file']
+        if upload and upload.size > self.MAX_FILE_SIZE:
+            raise forms.ValidationError('The roster file must be smaller than 1 MB.')
+        return upload
+
+    def clean(self):
+        cleaned_data = super().clean()
+        sources = [('Pasted roster', cleaned_data.get('roster') or '')]
+        upload = cleaned_data.get('roster_file')
+        if upload:
+            try:
+                sources.append((upload.name, upload.read().decode('utf-8-sig')))
+            except UnicodeDecodeError:
+                raise forms.ValidationError('The roster file must be UTF-8 text.')
+
+        participants, errors = [], []
+        for source, text in sources:
+            parsed, source_errors = self.parse(text)
+            participants.extend(parsed)
+            errors.extend(f'{source}, line {line_number}: {error}' for line_number, error in source_errors)
+        if errors:
+            raise forms.ValidationError(errors)
+        cleaned_data['participants'] = participants
+        return cleaned_data
+
+    def parse(self, text):
+        """Return ([(role_type, name)] in file order, [(line number, error)]) for every line of `text`"""
+        participants, errors = [], []
+        max_name = Role._meta.get_field('name').max_length
+        # skipinitialspace: in "Table Topics, "Lee, Jr"" the quote after the space still quotes
+        for line_number, row in enumerate(csv.reader(io.StringIO(text), skipinitialspace=True), start=1):
+            row = [cell.strip() for cell in row]
+            if not any(row) or row[0].startswith('#'):
+                continue
+            if len(row) != 2 or not row[1]:
+                errors.append((line_number, 'expected "category, name" (quote names that contain commas).'))
+                continue
+            category, name = row
+            role_type = self.CATEGORY_ALIASES.get(category.lower().replace('-', ' '))
+            if role_type is None:
+                if line_number == 1 and category.lower() in ('category', 'role', 'role_type'):
+                    continue  # Header row
+                errors.append((line_number, f'unknown category "{category}".'))
+            elif len(name) > max_name:
+                errors.append((line_number, f'names are limited to {max_name} characters.'))
+            else:
+                participants.append((role_type, name))
+        return participants, errors
+
+
 class RoleForm(forms.ModelForm):
     """Form for adding a role"""
     class Meta:
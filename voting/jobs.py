@@ -0,0 +1,58 @@
+"""
+Background jobs stored in the database.
+
+Register a function with ``@job('name')`` and queue it with
+``Job.objects.enqueue('name', {...})``; "manage.py run_jobs" picks it up.
+Payloads are JSON, so pass primary keys rather than model instances.
+Failed jobs are retried with exponential backoff until ``max_attempts``.
+"""
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Job
+
+registry = {}
+
+
+def job(name):
+    """Register the decorated function as the handler for jobs called `name`"""
+    def decorator(func):
+        registry[name] = func
+        return func
+    return decorator
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next attempt: exponential, capped, with jitter"""
+    delay = min(settings.JOB_RETRY_MAX_SECONDS, settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.75, 1.25)
+
+
+def run(job_obj):
+    """Run one claimed job and record the outcome; returns True on success"""
+    job_obj.attempts += 1
+    try:
+        handler = registry[job_obj.name]
+        handler(**job_obj.payload)
+    except Exception:
+        job_obj.last_error = traceback.format_exc()[-4000:]
+        if job_obj.attempts < job_obj.max_attempts and job_obj.name in registry:
+            job_obj.status = Job.QUEUED
+            job_obj.run_at = timezone.now() + timedelta(seconds=retry_delay(job_obj.attempts))
+        else:
+            job_obj.status = Job.FAILED
+            job_obj.finished_at = timezone.now()
+        succeeded = False
+    else:
+        job_obj.status = Job.DONE
+        job_obj.finished_at = timezone.now()
+        succeeded = True
+
+    job_obj.locked_by = ''
+    job_obj.locked_at = None
+    job_obj.save(update_fields=['attempts', 'status', 'run_at', 'last_error', 'locked_by', 'locked_at', 'finished_at'])
+    return succeeded
@@ -0,0 +1,68 @@
+"""
+Batched ballot upload for kiosk mode.
+
+A kiosk is one device passed around the room. It queues ballots locally
+(static/voting/js/kiosk.js) and uploads them in batches, each ballot with a
+client-generated key. Every ballot is stored under its own guest user named
+after that key, so a retried upload finds the user and skips the ballot:
+the username's unique index is the dedup table. "manage.py sweep_retention"
+deletes these users once the session's votes are archived.
+"""
+import re
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from . import models, storage
+from .cache import invalidate_tags, session_tag
+from .models import Role
+from .signals import bump_state_version
+
+KEY_PATTERN = re.compile(r'^[A-Za-z0-9-]{8,64}$')
+
+
+def guest_username(vote_session, key):
+    return models.guest_username('kiosk', vote_session, key)
+
+
+def ingest(vote_session, ballots):
+    """
+    Store a batch of ``{'key': str, 'roles': [role ids]}`` ballots in one
+    transaction. Returns ``{'accepted': [...], 'duplicate': [...],
+    'rejected': {key: reason}}``.
+    """
+    roles = {role.pk: role for role in Role.objects.filter(vote_session=vote_session)}
+    result = {'accepted': [], 'duplicate': [], 'rejected': {}}
+
+    valid = {}
+    for ballot in ballots:
+        key = ballot.get('key') if isinstance(ballot, dict) else None
+        if not isinstance(key, str) or not KEY_PATTERN.match(key):
+            continue  # Nothing to report it under; the client never sends these
+        chosen, error = storage.choose_roles(roles, ballot.get('roles'))
+        if error:
+            result['rejected'][key] = error
+        else:
+            valid[guest_username(vote_session, key)] = (key, chosen)
+    if not valid:
+        return result
+
+    with transaction.atomic():
+        existing = set(User.objects.filter(username__in=valid).values_list('username', flat=True))
+        new = [username for username in valid if username not in existing]
+        result['duplicate'] = [valid[username][0] for username in existing]
+        # Kiosk voters never log in: an unusable password costs no hashing
+        User.objects.bulk_create(
+            (User(username=username, password=make_password(None)) for username in new),
+            ignore_conflicts=True,
+        )
+        users = User.objects.filter(username__in=new)
+        storage.cast_many(vote_session, [(user, valid[user.username][1]) for user in users])
+        result['accepted'] = [valid[username][0] for username in new]
+
+    if result['accepted']:
+        # One invalidation for the whole batch (bulk inserts send no signals)
+        bump_state_version(vote_session.pk, polls_closed=True)
+        invalidate_tags(session_tag(vote_session.pk))
+    return result
@@ -0,0 +1,71 @@
+import json
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from voting.benchmarks import allow_test_client, isolated_cache, sample_session, scratch_databases
+from voting.models import BallotToken, Role
+
+
+class Command(BaseCommand):
+    help = 'Compares request times and query counts of the JSON API with the HTML pages it replaces'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--voters', type=int, default=40, help='Number of ballots cast in the sample session')
+        parser.add_argument('--iterations', type=int, default=50, help='Requests per endpoint')
+
+    def handle(self, *args, **options):
+        self.iterations = options['iterations']
+        header = f'{"endpoint":<22}{"median ms":>11}{"p95 ms":>9}{"queries":>9}{"bytes":>9}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        with scratch_databases(), allow_test_client(), isolated_cache():
+            _, vote_session, roles = sample_session(options['voters'])
+
+            voter_client = Client()
+            voter_client.force_login(User.objects.create_user('bench-fresh-voter'))
+            anonymous = Client()
+            code = vote_session.code
+
+            self.measure('vote page (HTML)', voter_client.get, reverse('vote', args=[code]))
+            self.measure('session (API)', voter_client.get, reverse('api_session', args=[code]))
+            self.measure('session (API, anon)', anonymous.get, reverse('api_session', args=[code]))
+
+            tokens = iter(BallotToken.objects.issue(vote_session, self.iterations + 1))
+            ballot = [roles[3 * t].pk for t in range(len(Role.ROLE_TYPES))]
+            self.measure(
+                'ballot (API, token)', anonymous.post, reverse('api_submit_ballot', args=[code]),
+                lambda: {
+                    'data': json.dumps({'token': next(tokens)[1], 'roles': ballot}),
+                    'content_type': 'application/json',
+                },
+                expected=201,
+            )
+
+            vote_session.polls_closed = True
+            vote_session.save()
+            self.measure('results page (HTML)', voter_client.get, reverse('results', args=[code]))
+            self.measure('results (API)', voter_client.get, reverse('api_session_results', args=[code]))
+
+    def measure(self, label, method, url, kwargs=dict, expected=200):
+        method(url, **kwargs())
+        timings, queries, size = [], 0, 0
+        for _ in range(self.iterations):
+            request_kwargs = kwargs()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = method(url, **request_kwargs)
+                timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == expected, f'{url} returned {response.status_code}'
+            queries, size = len(captured), len(response.content)
+
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(f'{label:<22}{statistics.median(timings):>11.2f}{p95:>9.2f}{queries:>9}{size:>9}')
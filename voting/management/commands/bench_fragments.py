@@ -0,0 +1,58 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from voting.benchmarks import allow_test_client, isolated_cache, sample_session, scratch_databases
+from voting.signals import bump_state_version
+
+
+class Command(BaseCommand):
+    help = 'Measures session page render times with cold and warm template fragment caches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--voters', type=int, default=40, help='Number of ballots cast in the sample session')
+        parser.add_argument('--iterations', type=int, default=50, help='Requests per page and cache state')
+
+    def handle(self, *args, **options):
+        self.iterations = options['iterations']
+        header = f'{"page":<10}{"cache":>7}{"median ms":>11}{"p95 ms":>9}{"queries":>9}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        with scratch_databases(), allow_test_client(), isolated_cache():
+            admin, vote_session, _ = sample_session(options['voters'])
+
+            admin_client = Client()
+            admin_client.force_login(admin)
+            voter_client = Client()
+            voter_client.force_login(User.objects.create_user('bench-fresh-voter'))
+
+            self.measure('manage', admin_client, reverse('manage_session', args=[vote_session.code]), vote_session)
+            self.measure('vote', voter_client, reverse('vote', args=[vote_session.code]), vote_session)
+            vote_session.polls_closed = True
+            vote_session.save()
+            self.measure('results', admin_client, reverse('results', args=[vote_session.code]), vote_session)
+
+    def measure(self, page, client, url, vote_session):
+        for label, cold in (('cold', True), ('warm', False)):
+            client.get(url)
+            timings, queries = [], 0
+            for _ in range(self.iterations):
+                if cold:
+                    bump_state_version(vote_session.pk)
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    timings.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200, f'{url} returned {response.status_code}'
+                queries = len(captured)
+
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(f'{page:<10}{label:>7}{statistics.median(timings):>11.2f}{p95:>9.2f}{queries:>9}')
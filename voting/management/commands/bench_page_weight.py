@@ -0,0 +1,48 @@
+import gzip
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from voting.benchmarks import allow_test_client
+
+
+INLINE_BLOCK = re.compile(r'<(style|script)(?![^>]*\bsrc=)[^>]*>(.*?)</\1>', re.S | re.I)
+STATIC_REF = re.compile(r'(?:href|src)="%s([^"?#]+)' % re.escape(settings.STATIC_URL))
+
+
+class Command(BaseCommand):
+    help = 'Reports the HTML and static asset bytes a visitor downloads for each page'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=['/', '/timer/', '/table-topics/', '/login/'],
+                            help='Page paths to measure')
+
+    def handle(self, *args, **options):
+        client = Client()
+        header = f'{"page":<16}{"html":>9}{"html gz":>9}{"inline":>9}{"assets":>9}{"first":>9}{"repeat":>9}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        with allow_test_client():
+            for path in options['paths']:
+                response = client.get(path)
+                html = response.content
+                text = html.decode()
+                inline = sum(len(m.group(2).encode()) for m in INLINE_BLOCK.finditer(text))
+
+                assets = 0
+                for name in set(STATIC_REF.findall(text)):
+                    found = finders.find(name)
+                    if found:
+                        with open(found, 'rb') as f:
+                            assets += len(f.read())
+
+                # Static assets are served with far-future cache headers, so
+                # a repeat visit only downloads the HTML again.
+                self.stdout.write(
+                    f'{path:<16}{len(html):>9}{len(gzip.compress(html)):>9}{inline:>9}'
+                    f'{assets:>9}{len(html) + assets:>9}{len(html):>9}'
+                )
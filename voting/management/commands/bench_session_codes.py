@@ -0,0 +1,62 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from voting.benchmarks import isolated_cache, scratch_databases
+from voting.models import CODE_ALPHABET, MIN_CODE_LENGTH, VoteSession, code_length_for, generate_random_code
+
+
+class Command(BaseCommand):
+    help = 'Measures session code allocation with a large number of existing sessions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--existing', type=int, default=150_000, help='Sessions created before measuring')
+        parser.add_argument('--sessions', type=int, default=2000, help='Sessions created through the allocator')
+
+    def handle(self, *args, **options):
+        existing, sessions = options['existing'], options['sessions']
+
+        # What the old fixed-length picker would face at this size
+        keyspace = len(CODE_ALPHABET) ** MIN_CODE_LENGTH
+        self.stdout.write(
+            f'Fixed {MIN_CODE_LENGTH}-char codes with {existing} sessions: '
+            f'{existing / keyspace:.1%} of picks collide'
+        )
+
+        with scratch_databases(), isolated_cache():
+            admin = User.objects.create_user('bench-admin')
+            codes = set()
+            while len(codes) < existing:
+                codes.add(generate_random_code(code_length_for(len(codes))))
+            expires_at = timezone.now()
+            start = time.perf_counter()
+            VoteSession.objects.bulk_create(
+                (VoteSession(title='Existing', created_by=admin, code=code, expires_at=expires_at) for code in codes),
+                batch_size=2000,
+            )
+            self.stdout.write(f'Seeded {existing} sessions in {time.perf_counter() - start:.1f}s')
+
+            timings, attempts, lengths = [], [], {}
+            for _ in range(sessions):
+                vote_session = VoteSession(title='Benchmark', created_by=admin)
+                reset_queries()
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    vote_session.save()
+                    timings.append((time.perf_counter() - start) * 1000)
+                # One existence check per code tried
+                attempts.append(sum('SELECT 1 AS "a"' in query['sql'] for query in captured))
+                lengths[len(vote_session.code)] = lengths.get(len(vote_session.code), 0) + 1
+
+            timings.sort()
+            self.stdout.write(
+                f'Allocated {sessions} codes: median {statistics.median(timings):.2f} ms, '
+                f'p99 {timings[int(len(timings) * 0.99)]:.2f} ms, '
+                f'mean attempts {statistics.mean(attempts):.3f}, max attempts {max(attempts)}, '
+                f'lengths {dict(sorted(lengths.items()))}'
+            )
@@ -0,0 +1,56 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from voting import storage
+from voting.benchmarks import create_session, isolated_cache, scratch_databases
+from voting.models import Ballot, Vote
+
+
+def table_bytes(model):
+    """On-disk bytes of a model's table and its indexes (SQLite dbstat)"""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name IN "
+            "(SELECT name FROM sqlite_master WHERE tbl_name = %s)", [table]
+        )
+        return cursor.fetchone()[0]
+
+
+class Command(BaseCommand):
+    help = 'Compares write throughput and on-disk size of Vote rows and packed Ballot rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--voters', type=int, default=2000, help='Ballots cast per storage mode')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Table sizes are read from SQLite\'s dbstat table')
+        voters = options['voters']
+
+        header = f'{"storage":<9}{"ballots/s":>11}{"rows":>8}{"bytes":>11}{"bytes/ballot":>14}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        with scratch_databases(), isolated_cache():
+            admin = User.objects.create_user('bench-admin')
+            users = User.objects.bulk_create(User(username=f'bench-voter-{i}') for i in range(voters))
+            for mode, model in (('rows', Vote), ('ballots', Ballot)):
+                vote_session, roles = create_session(admin)
+                rows_before, bytes_before = model.objects.count(), table_bytes(model)
+
+                with override_settings(VOTE_STORAGE=mode):
+                    start = time.perf_counter()
+                    for i, user in enumerate(users):
+                        # A transaction per ballot, as in the request that casts it
+                        with transaction.atomic():
+                            storage.cast(user, vote_session, [roles[3 * t + i % 3] for t in range(3)])
+                    elapsed = time.perf_counter() - start
+
+                rows = model.objects.count() - rows_before
+                size = table_bytes(model) - bytes_before
+                self.stdout.write(f'{mode:<9}{voters / elapsed:>11.0f}{rows:>8}{size:>11}{size / voters:>14.1f}')
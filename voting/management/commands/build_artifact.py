@@ -0,0 +1,114 @@
+import compileall
+import json
+import py_compile
+import shutil
+import subprocess
+import sys
+import tarfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.template.loaders.cached import Loader as CachedLoader
+from django.test.utils import override_settings
+
+
+BASE_DIR = Path(settings.BASE_DIR)
+
+# What a production host needs to run the site. static/ stays because
+# finders still read the responsive image manifest from it.
+ARTIFACT_CONTENTS = [
+    'manage.py',
+    'passenger_wsgi.py',
+    'gunicorn.conf.py',
+    'requirements.txt',
+    'toastyvotes',
+    'voting',
+    'templates',
+    'static',
+]
+IGNORE = shutil.ignore_patterns('__pycache__', '*.py[cod]', '.DS_Store')
+
+# Written at the artifact root; its presence is what lets --output be wiped
+BUILD_INFO = 'BUILD_INFO.json'
+
+
+def _git_revision():
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BASE_DIR, capture_output=True, text=True)
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+class Command(BaseCommand):
+    help = 'Builds a deployable copy of the project with precompiled bytecode and collected static files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=str(BASE_DIR / 'build' / 'toastyvotes'),
+                            help='Directory to build the artifact in (replaced if it holds a previous build)')
+        parser.add_argument('--archive', action='store_true',
+                            help='Also write <output>.tar.gz')
+
+    def handle(self, *args, **options):
+        output = Path(options['output']).resolve()
+        if output == BASE_DIR or output in BASE_DIR.parents:
+            raise CommandError('The output directory must not contain the project itself')
+        if output.exists():
+            if not (output / BUILD_INFO).exists():
+                raise CommandError(f'{output} exists and is not a previous build; remove it or pick another --output')
+            shutil.rmtree(output)
+        start = time.perf_counter()
+
+        self._check_template_caching()
+
+        output.mkdir(parents=True)
+        for name in ARTIFACT_CONTENTS:
+            source = BASE_DIR / name
+            if source.is_dir():
+                shutil.copytree(source, output / name, ignore=IGNORE)
+            else:
+                shutil.copy2(source, output / name)
+
+        # Unchecked hash-based .pyc files stay valid whatever mtimes the copy
+        # to the server gives the sources, so workers never recompile them.
+        # They must be built by the Python version that will run them.
+        if not compileall.compile_dir(output, quiet=1, invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH):
+            raise CommandError('Byte-compiling the artifact failed')
+
+        # Hashed names, .gz/.br copies and staticfiles.json are all produced
+        # here, so nothing is hashed or compressed on the server.
+        static_root = output / Path(settings.STATIC_ROOT).relative_to(BASE_DIR)
+        with override_settings(STATIC_ROOT=str(static_root)):
+            call_command('collectstatic', interactive=False, verbosity=0)
+
+        info = {
+            'revision': _git_revision(),
+            'python': '.'.join(map(str, sys.version_info[:3])),
+            'cache_tag': sys.implementation.cache_tag,
+            'built_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        }
+        (output / BUILD_INFO).write_text(json.dumps(info, indent=2) + '\n')
+
+        if options['archive']:
+            archive = output.with_name(output.name + '.tar.gz')
+            with tarfile.open(archive, 'w:gz') as tar:
+                tar.add(output, arcname=output.name)
+            self.stdout.write(f'Wrote {archive}')
+
+        static_files = sum(1 for path in static_root.rglob('*') if path.is_file())
+        pyc_files = sum(1 for _ in output.rglob('*.pyc'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Built {output} ({pyc_files} .pyc files, {static_files} static files) '
+            f'in {time.perf_counter() - start:.1f}s'
+        ))
+
+    def _check_template_caching(self):
+        """Refuse to build when templates would be re-parsed on every request"""
+        for engine in engines.all():
+            loaders = getattr(engine, 'engine', None) and engine.engine.template_loaders
+            if loaders and not any(isinstance(loader, CachedLoader) for loader in loaders):
+                raise CommandError(f'Template engine "{engine.name}" does not use the cached template loader')
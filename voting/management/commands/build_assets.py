@@ -0,0 +1,225 @@
+import gzip
+import re
+from pathlib import Path
+
+import brotli
+import crispy_bootstrap5
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+VENDOR_DIR = Path(settings.BASE_DIR) / 'assets' / 'vendor' / 'bootstrap-5.2.2'
+STATIC_DIR = Path(settings.BASE_DIR) / 'static' / 'voting'
+OUTPUT_DIR = STATIC_DIR / 'dist'
+
+# Bundle name -> source files, in load order. The plain bootstrap.min.js is
+# used instead of the bundle because nothing here needs Popper (dropdowns,
+# tooltips, popovers).
+BUNDLES = {
+    'app.min.css': [VENDOR_DIR / 'bootstrap.min.css', STATIC_DIR / 'css' / 'style.css'],
+    'app.min.js': [VENDOR_DIR / 'bootstrap.min.js', STATIC_DIR / 'js' / 'script.js'],
+}
+
+# Files scanned for class names still in use when pruning unused CSS rules
+CLASS_SOURCES = [
+    (Path(settings.BASE_DIR) / 'templates', '*.html'),
+    (Path(crispy_bootstrap5.__file__).parent / 'templates', '*.html'),
+    (STATIC_DIR / 'js', '*.js'),
+    (VENDOR_DIR, '*.js'),
+]
+
+# Class prefixes built at render time, e.g. alert-{{ message.tags }}
+CLASS_SAFELIST = ('alert-',)
+
+STRING = r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\''
+CSS_TOKEN = re.compile(rf'({STRING}|/\*.*?\*/|[{{}};])', re.S)
+CLASS_NAME = re.compile(r'\.(-?[_a-zA-Z][\w-]*)')
+# Classes inside :not() only narrow a match, so they never make a rule unused
+NEGATION = re.compile(r':not\([^)]*\)')
+SOURCE_MAP = re.compile(r'/[*/]# sourceMappingURL=\S+(?: \*/)?')
+
+
+def parse_css(css):
+    """
+    Split a stylesheet into a list of ``(prelude, body)`` nodes.
+
+    ``body`` is the declaration text of a plain rule, a list of child nodes for
+    block at-rules such as @media or @keyframes, or ``None`` for statements
+    such as @import. Comments other than ``/*! license */`` blocks are dropped.
+    """
+    nodes, stack = [], []
+    current, buf = nodes, ''
+    for part in CSS_TOKEN.split(css):
+        if part.startswith('/*'):
+            if part.startswith('/*!') and not stack:
+                current.append((part, None))
+        elif part == '{':
+            prelude, buf = buf.strip(), ''
+            stack.append((current, prelude))
+            if prelude.startswith('@') and not prelude.startswith(('@font-face', '@page')):
+                children = []
+                current.append((prelude, children))
+                current = children
+            else:
+                current = None
+        elif part == '}':
+            if not stack:
+                raise CommandError('Unbalanced braces in stylesheet')
+            parent, prelude = stack.pop()
+            if current is None:
+                parent.append((prelude, buf))
+            current, buf = parent, ''
+        elif part == ';' and current is not None:
+            current.append(((buf + part).strip(), None))
+            buf = ''
+        else:
+            buf += part
+    if stack:
+        raise CommandError('Unbalanced braces in stylesheet')
+    return nodes
+
+
+def split_selectors(prelude):
+    """Split a selector list on its top-level commas"""
+    parts, depth, start = [], 0, 0
+    for match in re.finditer(rf'{STRING}|[(),]', prelude):
+        token = match.group()
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif token == ',' and depth == 0:
+            parts.append(prelude[start:match.start()])
+            start = match.end()
+    parts.append(prelude[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+
+def prune(nodes, used):
+    """Drop selectors that reference classes never used by our templates or scripts"""
+    pruned = []
+    for prelude, body in nodes:
+        if isinstance(body, list):
+            children = prune(body, used)
+            if children:
+                pruned.append((prelude, children))
+        elif body is None or prelude.startswith('@'):
+            pruned.append((prelude, body))
+        else:
+            selectors = [
+                s for s in split_selectors(prelude)
+                if all(c in used or c.startswith(CLASS_SAFELIST) for c in CLASS_NAME.findall(NEGATION.sub('', re.sub(STRING, '', s))))
+            ]
+            if selectors:
+                pruned.append((','.join(selectors), body))
+    return pruned
+
+
+def _squeeze(text, punctuation):
+    """Collapse whitespace outside strings and remove it around the given punctuation"""
+    out = []
+    for i, part in enumerate(re.split(rf'({STRING})', text)):
+        if i % 2 == 0:
+            part = re.sub(r'\s+', ' ', part)
+            part = re.sub(rf'\s*([{punctuation}])\s*', r'\1', part)
+        out.append(part)
+    return ''.join(out).strip()
+
+
+def serialize(nodes):
+    """Write parsed nodes back out as minified CSS"""
+    out = []
+    for prelude, body in nodes:
+        if isinstance(body, list):
+            out.append(f'{_squeeze(prelude, ",")}{{{serialize(body)}}}')
+        elif body is None:
+            out.append(prelude if prelude.startswith('/*!') else _squeeze(prelude, ',;'))
+        else:
+            declarations = _squeeze(body, ':;,').rstrip(';')
+            out.append(f'{_squeeze(prelude, ",>~+")}{{{declarations}}}')
+    return ''.join(out)
+
+
+def minify_js(source):
+    """
+    Strip comments, indentation and blank lines from a script.
+
+    Line breaks are kept so automatic semicolon insertion behaves as before.
+    Strings and template literals are copied untouched; regular expression
+    literals are not recognised, so keep them out of scripts bundled here.
+    """
+    out, i, n = [], 0, len(source)
+    while i < n:
+        ch = source[i]
+        if ch in '\'"`':
+            end = i + 1
+            while end < n and source[end] != ch:
+                end += 2 if source[end] == '\\' else 1
+            out.append(source[i:end + 1])
+            i = end + 1
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            if source.startswith('/*!', i):
+                out.append(source[i:end + 2])
+            i = end + 2
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+        else:
+            out.append(ch)
+            i += 1
+    lines = (line.strip() for line in ''.join(out).splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def used_class_names():
+    """Collect every identifier-like token from the files that may name a CSS class"""
+    used = set()
+    for directory, pattern in CLASS_SOURCES:
+        for path in directory.rglob(pattern):
+            used.update(re.findall(r'-?[_a-zA-Z][\w-]*', path.read_text(encoding='utf-8')))
+    return used
+
+
+class Command(BaseCommand):
+    help = 'Builds the minified, pruned CSS and JS bundles in static/voting/dist from vendored sources'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Fail if the committed bundles are out of date instead of writing them')
+
+    def handle(self, *args, **options):
+        used = used_class_names()
+        OUTPUT_DIR.mkdir(exist_ok=True)
+        stale = []
+
+        for name, sources in BUNDLES.items():
+            parts = []
+            for source in sources:
+                text = SOURCE_MAP.sub('', source.read_text(encoding='utf-8'))
+                if name.endswith('.css'):
+                    text = serialize(prune(parse_css(text.replace('@charset "UTF-8";', '')), used))
+                elif not source.name.endswith('.min.js'):
+                    text = minify_js(text)
+                parts.append(text.strip())
+
+            separator = '' if name.endswith('.css') else ';\n'
+            content = (separator.join(parts) + '\n').encode()
+            if name.endswith('.css'):
+                content = b'@charset "UTF-8";' + content
+            original = sum(source.stat().st_size for source in sources)
+
+            target = OUTPUT_DIR / name
+            if options['check']:
+                if not target.exists() or target.read_bytes() != content:
+                    stale.append(name)
+                continue
+            target.write_bytes(content)
+
+            self.stdout.write(
+                f'{name}: {original} -> {len(content)} bytes '
+                f'(gzip {len(gzip.compress(content, 9))}, brotli {len(brotli.compress(content, quality=11))})'
+            )
+
+        if stale:
+            raise CommandError(f'Out of date: {", ".join(stale)}. Run "manage.py build_assets".')
@@ -0,0 +1,131 @@
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from voting.templatetags.voting_extras import RESPONSIVE_MANIFEST
+
+
+STATIC_DIR = Path(settings.BASE_DIR) / 'static'
+OUTPUT_DIR = STATIC_DIR / 'voting' / 'images' / 'responsive'
+FAVICON_DIR = STATIC_DIR / 'voting' / 'images' / 'favicon'
+
+# Source image -> widths to emit, at most the source width. Each width is
+# written as an optimized PNG and a WebP; pick widths that cover the largest
+# rendered size at 1x and 2x pixel density.
+RESPONSIVE_IMAGES = {
+    'voting/images/toastyvotes-logo-large.png': (150, 300, 450, 600),
+    'voting/images/toastyvotes-logo.png': (30, 60, 90),
+    'voting/images/vote-icon.png': (40, 80, 100),
+    'voting/images/timer-icon.png': (40, 80, 100),
+    'voting/images/trophy-icon.png': (40, 80, 100),
+    'voting/images/trophy.png': (24, 48),
+}
+
+FAVICON_SOURCE = 'voting/images/vote-icon.png'
+FAVICON_ICO_SIZES = [(16, 16), (32, 32), (48, 48)]
+FAVICON_PNG_SIZES = {'favicon-32.png': 32, 'apple-touch-icon.png': 180, 'icon-192.png': 192}
+
+WEBP_QUALITY = 80
+
+
+def _smallest(*encodings):
+    return min(encodings, key=len)
+
+
+def _encode(image, fmt, **params):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **params)
+    return buffer.getvalue()
+
+
+def _save_png(image, path):
+    """Save a PNG losslessly, using an exact palette when that comes out smaller"""
+    candidates = [image]
+    colors = image.getcolors(256) if image.mode in ('RGB', 'RGBA') else None
+    if colors is not None:
+        candidates.append(image.quantize(colors=len(colors), method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE))
+
+    path.write_bytes(_smallest(*(_encode(c, 'PNG', optimize=True) for c in candidates)))
+
+
+def _save_webp(image, path):
+    """Save a WebP, lossless when that beats lossy (flat icons and logos)"""
+    path.write_bytes(_smallest(
+        _encode(image, 'WEBP', quality=WEBP_QUALITY, method=6),
+        _encode(image, 'WEBP', lossless=True, method=6),
+    ))
+
+
+def render_variant(source, width):
+    """Resize one source image to `width` and write its PNG and WebP variants"""
+    with Image.open(STATIC_DIR / source) as image:
+        height = round(image.height * width / image.width)
+        resized = image.resize((width, height), Image.Resampling.LANCZOS) if width != image.width else image.copy()
+
+    stem = Path(source).stem
+    png_name = f'{stem}-{width}.png'
+    webp_name = f'{stem}-{width}.webp'
+    _save_png(resized, OUTPUT_DIR / png_name)
+    _save_webp(resized, OUTPUT_DIR / webp_name)
+
+    prefix = 'voting/images/responsive/'
+    return source, {'width': width, 'height': height, 'png': prefix + png_name, 'webp': prefix + webp_name}
+
+
+def render_favicons():
+    """Write favicon.ico and the PNG touch icons"""
+    with Image.open(STATIC_DIR / FAVICON_SOURCE) as image:
+        image = image.convert('RGBA')
+        image.save(FAVICON_DIR / 'favicon.ico', sizes=FAVICON_ICO_SIZES)
+        for name, size in FAVICON_PNG_SIZES.items():
+            _save_png(image.resize((size, size), Image.Resampling.LANCZOS), FAVICON_DIR / name)
+    return ['favicon.ico', *FAVICON_PNG_SIZES]
+
+
+class Command(BaseCommand):
+    help = 'Builds responsive PNG/WebP variants, the favicon set and the manifest used by {% responsive_image %}'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Number of worker processes (default: one per CPU)')
+
+    def handle(self, *args, **options):
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        FAVICON_DIR.mkdir(parents=True, exist_ok=True)
+        start = time.perf_counter()
+
+        tasks = []
+        for source, widths in RESPONSIVE_IMAGES.items():
+            with Image.open(STATIC_DIR / source) as image:
+                source_width = image.width
+            tasks.extend((source, width) for width in widths if width <= source_width)
+
+        manifest = {source: [] for source in RESPONSIVE_IMAGES}
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            favicons = pool.submit(render_favicons)
+            for source, variant in pool.map(render_variant, *zip(*tasks)):
+                manifest[source].append(variant)
+            favicons = favicons.result()
+
+        with open(STATIC_DIR / RESPONSIVE_MANIFEST, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+        for source, variants in manifest.items():
+            original = (STATIC_DIR / source).stat().st_size
+            smallest = min(variants, key=lambda v: v['width'])
+            self.stdout.write(
+                f'{source}: {original} bytes -> smallest variant {smallest["width"]}px '
+                f'{(STATIC_DIR / smallest["webp"]).stat().st_size} bytes webp'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {len(tasks) * 2} variants and {len(favicons)} favicons '
+            f'in {time.perf_counter() - start:.2f}s'
+        ))
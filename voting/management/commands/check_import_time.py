@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# What a fresh worker imports before it can answer its first request
+STARTUP_CODE = (
+    'import toastyvotes.wsgi\n'
+    'from django.urls import get_resolver\n'
+    'get_resolver().url_patterns\n'
+)
+
+
+def parse_importtime(output):
+    """Yield (self_us, cumulative_us, depth, module) for each line of -X importtime output"""
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        yield int(self_us), int(cumulative_us), depth, name.strip()
+
+
+class Command(BaseCommand):
+    help = 'Reports the import-time breakdown of a cold worker and fails if it exceeds the budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget', type=int, default=settings.IMPORT_TIME_BUDGET_MS,
+                            help='Maximum total import time in milliseconds')
+        parser.add_argument('--top', type=int, default=15, help='Number of packages to list')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'toastyvotes.settings'))
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_CODE],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f'Importing the project failed:\n{result.stderr[-2000:]}')
+
+        by_package = defaultdict(int)
+        total = 0
+        for self_us, cumulative_us, depth, name in parse_importtime(result.stderr):
+            by_package[name.split('.')[0]] += self_us
+            if depth == 0:
+                total += cumulative_us
+
+        self.stdout.write(f'{"package":<32}{"self ms":>10}{"share":>8}')
+        for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'{package:<32}{self_us / 1000:>10.1f}{self_us / total:>8.0%}')
+
+        total_ms = total / 1000
+        message = f'Total import time: {total_ms:.1f} ms (budget {options["budget"]} ms)'
+        if total_ms > options['budget']:
+            raise CommandError(message)
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from voting import storage
+from voting.models import Ballot, Role, Vote
+
+
+class Command(BaseCommand):
+    help = 'Moves stored votes between per-category Vote rows and packed Ballot rows, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--to', choices=['ballots', 'rows'], required=True, help='Storage format to convert into')
+        parser.add_argument('--batch-size', type=int, default=500, help='Voters converted per transaction')
+
+    def handle(self, *args, **options):
+        if options['to'] == 'ballots':
+            count = storage.convert_rows_to_ballots(Vote, Ballot, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Packed {count} ballot(s)'))
+        else:
+            count = storage.convert_ballots_to_rows(Ballot, Vote, Role, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Unpacked {count} ballot(s) into Vote rows'))
+        self.stdout.write('Set VOTE_STORAGE to match so new ballots are written the same way.')
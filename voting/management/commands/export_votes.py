@@ -0,0 +1,47 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voting import exports
+from voting.models import VoteSession
+
+
+class Command(BaseCommand):
+    help = 'Streams the vote ledger or results of one or more sessions as CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('codes', nargs='*', help='Session codes (default: every session)')
+        parser.add_argument('--kind', choices=['votes', 'results'], default='votes', help='What to export')
+        parser.add_argument('--format', choices=sorted(exports.FORMATS), default='csv', help='Output format')
+        parser.add_argument('--since', help='Only sessions created on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--output', '-o', help='File to write (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched from the database at a time')
+
+    def handle(self, *args, **options):
+        vote_sessions = VoteSession.objects.order_by('created_at')
+        if options['codes']:
+            vote_sessions = vote_sessions.filter(code__in=options['codes'])
+            missing = set(options['codes']) - set(vote_sessions.values_list('code', flat=True))
+            if missing:
+                raise CommandError(f'Unknown session code(s): {", ".join(sorted(missing))}')
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError(f'--since must be a date like 2026-01-31, not {options["since"]!r}')
+            vote_sessions = vote_sessions.filter(created_at__date__gte=since)
+
+        if options['kind'] == 'votes':
+            rows = exports.ledger_rows(vote_sessions.iterator(), chunk_size=options['chunk_size'])
+            fields = exports.LEDGER_FIELDS
+        else:
+            rows = exports.results_rows(vote_sessions.iterator())
+            fields = exports.RESULTS_FIELDS
+
+        lines = exports.encode(rows, fields, options['format'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as out:
+                out.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
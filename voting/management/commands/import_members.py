@@ -0,0 +1,48 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voting import members
+
+
+class Command(BaseCommand):
+    help = 'Imports members from a CSV file (username, email, first_name, last_name, password, admin)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='CSV file with a header row; "-" reads stdin')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Password hashing processes (default: one per CPU)')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the file without creating anyone')
+
+    def handle(self, *args, **options):
+        if options['csv_file'] == '-':
+            text = sys.stdin.read()
+        else:
+            try:
+                with open(options['csv_file'], encoding='utf-8-sig') as f:
+                    text = f.read()
+            except OSError as e:
+                raise CommandError(f'Could not read {options["csv_file"]}: {e}')
+
+        rows, errors = members.parse_members(text)
+        if errors:
+            for line_number, error in errors:
+                self.stderr.write(f'Line {line_number}: {error}')
+            raise CommandError(f'{len(errors)} invalid row(s); nothing was imported')
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'{len(rows)} valid row(s)'))
+            return
+
+        result = members.import_members(rows, workers=options['workers'])
+        for username in result['skipped']:
+            self.stdout.write(f'Skipped existing user "{username}"')
+        elapsed = result['hash_seconds'] + result['insert_seconds']
+        self.stdout.write(
+            f'Hashed passwords in {result["hash_seconds"]:.2f}s with {options["workers"]} worker(s), '
+            f'inserted in {result["insert_seconds"]:.2f}s'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {result["created"]} member(s), skipped {len(result["skipped"])}'
+            + (f' ({result["created"] / elapsed:.1f} users/s)' if elapsed else '')
+        ))
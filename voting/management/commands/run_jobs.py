@@ -0,0 +1,92 @@
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from voting import jobs, tasks  # noqa: F401  (tasks registers the handlers)
+from voting.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=2, help='Worker threads per process')
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes to fork')
+        parser.add_argument('--batch', type=int, default=1, help='Jobs a thread claims at a time')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due instead of polling')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.stop = threading.Event()
+        # Worker threads (and forked processes) exit after their current job
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: self.stop.set())
+
+        if options['processes'] <= 1:
+            self.work()
+            return
+
+        # Children must not share the parent's database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        children = [context.Process(target=self.work) for _ in range(options['processes'])]
+        for child in children:
+            child.start()
+        try:
+            for child in children:
+                while child.is_alive():
+                    child.join(timeout=1)
+                    if self.stop.is_set():
+                        child.terminate()
+        finally:
+            for child in children:
+                child.join()
+
+    def work(self):
+        """Run worker threads in this process until stopped (or drained with --once)"""
+        threads = [
+            threading.Thread(target=self.loop, name=f'jobs-{i}', daemon=True)
+            for i in range(self.options['threads'])
+        ]
+        for thread in threads:
+            thread.start()
+
+        lease = timedelta(seconds=settings.JOB_LEASE_SECONDS)
+        next_sweep = 0
+        while any(thread.is_alive() for thread in threads):
+            if time.monotonic() >= next_sweep:
+                requeued = Job.objects.requeue_stale(lease)
+                if requeued:
+                    self.stderr.write(f'Requeued {requeued} job(s) abandoned by a dead worker')
+                close_old_connections()
+                next_sweep = time.monotonic() + lease.total_seconds() / 2
+            time.sleep(0.5)
+        connections.close_all()
+
+    def loop(self):
+        worker = f'{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}'
+        while not self.stop.is_set():
+            close_old_connections()
+            claimed = Job.objects.claim(worker, self.options['batch'])
+            if not claimed:
+                if self.options['once']:
+                    break
+                self.stop.wait(self.options['poll'])
+                continue
+            for job in claimed:
+                start = time.perf_counter()
+                ok = jobs.run(job)
+                self.stdout.write(
+                    f'{job.name} #{job.pk} {"done" if ok else job.get_status_display().lower()} '
+                    f'in {(time.perf_counter() - start) * 1000:.0f} ms (attempt {job.attempts})'
+                )
+        connections.close_all()
@@ -0,0 +1,143 @@
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from voting import kiosk, storage
+from voting.cache import invalidate_tags, session_tag
+from voting.models import Ballot, Job, Participation, Role, Vote, VoteSession
+from voting.signals import bump_state_version
+
+
+class Command(BaseCommand):
+    help = 'Deactivates expired sessions, archives old votes into per-role counts, deletes their guest voters, finished jobs and stale logins'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=settings.RETENTION_CHUNK_SIZE,
+                            help='Rows changed per transaction')
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help='Seconds to sleep between chunks so live writes get the lock')
+
+    def handle(self, *args, **options):
+        self.chunk_size = options['chunk_size']
+        self.pause = options['pause']
+        self.guests = 0
+        now = timezone.now()
+
+        deactivated = self.deactivate_expired(now)
+        self.stdout.write(f'Deactivated {deactivated} expired session(s)')
+
+        cutoff = now - timedelta(days=settings.VOTE_RETENTION_DAYS)
+        sessions, votes = self.archive_votes(cutoff)
+        self.stdout.write(f'Archived {votes} vote(s) from {sessions} session(s) older than {settings.VOTE_RETENTION_DAYS} days')
+
+        self.guests += self.delete_guests()
+        self.stdout.write(f'Deleted {self.guests} guest voter(s) of archived sessions')
+
+        jobs = self.purge_jobs(now - timedelta(days=settings.JOB_RETENTION_DAYS))
+        self.stdout.write(f'Deleted {jobs} finished job(s) older than {settings.JOB_RETENTION_DAYS} days')
+
+        cleared = self.clear_sessions(now)
+        self.stdout.write(self.style.SUCCESS(f'Cleared {cleared} expired login session(s)'))
+
+    def chunks(self, queryset):
+        """Yield lists of up to chunk_size primary keys until `queryset` is empty"""
+        while True:
+            pks = list(queryset.values_list('pk', flat=True)[:self.chunk_size])
+            if not pks:
+                return
+            yield pks
+            time.sleep(self.pause)
+
+    def deactivate_expired(self, now):
+        total = 0
+        for pks in self.chunks(VoteSession.objects.filter(is_active=True, expires_at__lte=now)):
+            total += VoteSession.objects.filter(pk__in=pks).update(is_active=False)
+        return total
+
+    def archive_votes(self, cutoff):
+        """Fold each old session's votes into Role.archived_votes, one chunk per transaction"""
+        sessions = votes = 0
+        old_sessions = VoteSession.objects.filter(expires_at__lte=cutoff, archived_at__isnull=True)
+        for vote_session in old_sessions.only('pk', 'code').iterator():
+            for pks in self.chunks(Vote.objects.filter(vote_session=vote_session)):
+                counts = Counter(dict(
+                    Vote.objects.filter(pk__in=pks).values('role_id').annotate(n=Count('pk')).values_list('role_id', 'n')
+                ))
+                votes += self.archive_chunk(Vote, pks, counts)
+
+            role_ids = {(r.role_type, r.position): r.pk for r in Role.objects.filter(vote_session=vote_session)}
+            for pks in self.chunks(Ballot.objects.filter(vote_session=vote_session)):
+                counts = Counter()
+                for choices in Ballot.objects.filter(pk__in=pks).values_list('choices', flat=True):
+                    counts.update(
+                        role_ids[key] for key in Ballot.unpack(choices).items() if key in role_ids
+                    )
+                votes += self.archive_chunk(Ballot, pks, counts)
+
+            VoteSession.objects.filter(pk=vote_session.pk).update(archived_at=timezone.now())
+            bump_state_version(vote_session.pk)
+            invalidate_tags(session_tag(vote_session.pk))
+            self.guests += self.delete_kiosk_guests(vote_session)
+            sessions += 1
+        return sessions, votes
+
+    def delete_guests(self):
+        """Delete the voters made for ballot tokens once their session is archived"""
+        total = 0
+        for pks in self.chunks(User.objects.filter(ballot_token__vote_session__archived_at__isnull=False)):
+            total += User.objects.filter(pk__in=pks).delete()[1].get('auth.User', 0)
+        return total
+
+    def delete_kiosk_guests(self, vote_session):
+        """Kiosk guests are only linked to their session by name (see voting/kiosk.py)"""
+        total = 0
+        for pks in self.chunks(User.objects.filter(username__startswith=kiosk.guest_username(vote_session, ''))):
+            total += User.objects.filter(pk__in=pks).delete()[1].get('auth.User', 0)
+        return total
+
+    def archive_chunk(self, model, pks, counts):
+        """
+        Add `counts` (role id -> votes) to the roles, record who voted and
+        delete the rows they came from
+        """
+        with transaction.atomic():
+            for role_id, n in counts.items():
+                Role.objects.filter(pk=role_id).update(archived_votes=F('archived_votes') + n)
+            # A voter's Vote rows can span chunks
+            Participation.objects.bulk_create(
+                [
+                    Participation(user_id=user_id, vote_session_id=session_id)
+                    for user_id, session_id in model.objects.filter(pk__in=pks).values_list('user_id', 'vote_session_id').distinct()
+                ],
+                ignore_conflicts=True,
+            )
+            # QuerySet.delete() would fire the per-row post_delete cache
+            # handler; the session is invalidated once when it is done
+            storage.raw_delete(model, pks)
+        return sum(counts.values())
+
+    def purge_jobs(self, cutoff):
+        total = 0
+        finished = Job.objects.filter(status__in=[Job.DONE, Job.FAILED], finished_at__lt=cutoff)
+        for pks in self.chunks(finished):
+            total += Job.objects.filter(pk__in=pks).delete()[0]
+        return total
+
+    def clear_sessions(self, now):
+        """Delete expired django_session rows in chunks (clearsessions deletes them all at once)"""
+        if settings.SESSION_ENGINE != 'django.contrib.sessions.backends.db':
+            call_command('clearsessions')
+            return 0
+        total = 0
+        for pks in self.chunks(Session.objects.filter(expire_date__lt=now)):
+            total += Session.objects.filter(pk__in=pks).delete()[0]
+        return total
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-19 10:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0004_generatedquestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='votesession',
+            name='state_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
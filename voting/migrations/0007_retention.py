@@ -0,0 +1,27 @@
+# Generated by Django 4.2.10 on 2026-10-19 11:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0006_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='role',
+            name='archived_votes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='votesession',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='votesession',
+            index=models.Index(condition=models.Q(('is_active', True), ('polls_closed', False)), fields=['-created_at'], name='voting_session_active_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.10 on 2026-10-19 11:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def require_no_ballots(apps, schema_editor):
+    # Dropping the table would lose packed ballots; converting them is left to
+    # the management command so this migration never depends on live code
+    if apps.get_model('voting', 'Ballot').objects.exists():
+        raise RuntimeError('Run "manage.py convert_votes --to rows" before unapplying this migration.')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('voting', '0007_retention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ballot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('choices', models.PositiveIntegerField()),
+                ('cast_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='ballots', to=settings.AUTH_USER_MODEL)),
+                ('vote_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ballots', to='voting.votesession')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='ballot',
+            constraint=models.UniqueConstraint(fields=('user', 'vote_session'), name='unique_ballot_per_voter'),
+        ),
+        migrations.RunPython(migrations.RunPython.noop, require_no_ballots),
+    ]
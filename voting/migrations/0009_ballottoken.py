@@ -0,0 +1,28 @@
+# Generated by Django 4.2.10 on 2026-10-19 11:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('voting', '0008_ballot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BallotToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=50)),
+                ('digest', models.CharField(editable=False, max_length=64, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('used_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='ballot_token', to=settings.AUTH_USER_MODEL)),
+                ('vote_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ballot_tokens', to='voting.votesession')),
+            ],
+        ),
+    ]
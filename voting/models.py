@@ -1,15 +1,56 @@
-from django.db import models
+from django.conf import settings
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import F
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
-import random
+from django.core.exceptions import ValidationError
+from django.utils.crypto import constant_time_compare, get_random_string, salted_hmac
+import secrets
 import string
 from datetime import timedelta
 from django.utils import timezone
+from . import similarity
 
 
-def generate_random_code(length=4):
+CODE_ALPHABET = string.ascii_lowercase + string.digits
+MIN_CODE_LENGTH = 4
+MAX_CODE_LENGTH = 10
+# Use a longer code once this share of the shorter codes is taken, so a random
+# pick collides at most this often
+CODE_MAX_LOAD = 1 / 8
+# Collisions tolerated at one length before moving up to the next
+CODE_ATTEMPTS_PER_LENGTH = 3
+
+
+def generate_random_code(length=MIN_CODE_LENGTH):
     """Generate a random alphanumeric code"""
-    chars = string.ascii_lowercase + string.digits
-    return ''.join(random.choice(chars) for _ in range(length))
+    return ''.join(secrets.choice(CODE_ALPHABET) for _ in range(length))
+
+
+def code_length_for(existing):
+    """Shortest code length whose keyspace is still at most CODE_MAX_LOAD full with `existing` codes"""
+    length = MIN_CODE_LENGTH
+    while length < MAX_CODE_LENGTH and existing >= len(CODE_ALPHABET) ** length * CODE_MAX_LOAD:
+        length += 1
+    return length
+
+
+def guest_username(kind, vote_session, suffix):
+    """
+    Username for a voter that never logs in (ballot tokens, kiosk ballots).
+    ':' is not allowed in usernames people register, so these can't be taken.
+    """
+    return f'{kind}:{vote_session.code}:{suffix}'
+
+
+def lock_rows(queryset):
+    """Lock the rows of `queryset` until the transaction ends"""
+    if connections[queryset.db].features.has_select_for_update:
+        list(queryset.select_for_update().values_list('pk'))
+    else:
+        # SQLite has no row locks; any write takes the database write lock
+        pk_name = queryset.model._meta.pk.name
+        queryset.update(**{pk_name: F(pk_name)})
 
 
 class Role(models.Model):
@@ -22,8 +63,13 @@ class Role(models.Model):
     
     name = models.CharField(max_length=100)
     role_type = models.CharField(max_length=20, choices=ROLE_TYPES)
-    position = models.IntegerField(default=1)  # 1 or 2 for each role type
+    position = models.IntegerField(default=1)  # 1, 2, ... within each role type
     vote_session = models.ForeignKey('VoteSession', on_delete=models.CASCADE, related_name='roles')
+    # Votes removed by "manage.py sweep_retention", kept so results still add up
+    archived_votes = models.PositiveIntegerField(default=0, editable=False)
+    
+    # Packed ballots (Ballot.choices) point at a role by these
+    BALLOT_KEY_FIELDS = ('vote_session', 'role_type', 'position')
     
     class Meta:
         unique_together = ['vote_session', 'role_type', 'position']
@@ -31,6 +77,45 @@ class Role(models.Model):
     
     def __str__(self):
         return f"{self.get_role_type_display()} {self.position}: {self.name}"
+    
+    def in_packed_ballots(self):
+        """True once its session has packed ballots: moving or deleting the role would move their votes"""
+        return self.pk is not None and Ballot.objects.filter(vote_session__roles=self.pk).exists()
+    
+    def clean(self):
+        if self.in_packed_ballots():
+            stored = Role.objects.values(*self.BALLOT_KEY_FIELDS).get(pk=self.pk)
+            current = {'vote_session': self.vote_session_id, 'role_type': self.role_type, 'position': self.position}
+            if stored != current:
+                raise ValidationError(
+                    'Ballots have been cast for this session, so the category and position can no longer change.'
+                )
+
+
+class VoteSessionManager(models.Manager):
+    def transition(self, session_id, expected=None, **changes):
+        """
+        Apply `changes` to a session in one conditional UPDATE, only if its
+        current values match `expected`, and bump its state version.
+
+        Returns the changed fields and the new ``state_version``, or None when
+        no row matched (the session is gone or already changed). Receivers of
+        ``signals.session_state_changed`` are told once the change commits.
+        """
+        from .signals import session_state_changed
+
+        with transaction.atomic():
+            updated = self.filter(pk=session_id, **(expected or {})).update(
+                state_version=F('state_version') + 1, **changes,
+            )
+            if not updated:
+                return None
+            # Read back inside the transaction: the UPDATE holds the row
+            state = self.filter(pk=session_id).values('state_version', *changes).get()
+            transaction.on_commit(lambda: session_state_changed.send(
+                sender=VoteSession, session_id=session_id, state=state,
+            ))
+        return state
 
 
 class VoteSession(models.Model):
@@ -43,17 +128,66 @@ class VoteSession(models.Model):
     is_active = models.BooleanField(default=True)
     polls_closed = models.BooleanField(default=False)
     show_results = models.BooleanField(default=False)
+    # Bumped whenever the session, its roles or its final votes change; part
+    # of the template fragment cache keys (see voting/signals.py)
+    state_version = models.PositiveIntegerField(default=0, editable=False)
+    # Set once the session's Vote rows have been folded into Role.archived_votes
+    archived_at = models.DateTimeField(null=True, blank=True, editable=False)
+    
+    objects = VoteSessionManager()
+    
+    class Meta:
+        indexes = [
+            # The dashboard's "latest active session" lookup
+            models.Index(
+                fields=['-created_at'],
+                condition=models.Q(is_active=True, polls_closed=False),
+                name='voting_session_active_idx',
+            ),
+        ]
     
     def save(self, *args, **kwargs):
-        # Generate a random code if one doesn't exist
-        if not self.code:
-            self.code = generate_random_code()
-        
         # Set expiration date to 24 hours from now if not set
         if not self.expires_at:
             self.expires_at = timezone.now() + timedelta(hours=24)
         
-        super().save(*args, **kwargs)
+        # Increment in the UPDATE itself so a concurrent bump is never lost
+        bump = not self._state.adding
+        if bump:
+            self.state_version = F('state_version') + 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'state_version'}
+        
+        if self._state.adding and not self.code:
+            self._insert_with_new_code(*args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
+        
+        if bump:
+            self.refresh_from_db(fields=['state_version'])
+    
+    def _insert_with_new_code(self, *args, **kwargs):
+        """
+        Insert the session under a fresh random code. Codes start at the
+        length code_length_for() picks for the current session count and grow
+        after CODE_ATTEMPTS_PER_LENGTH collisions, so the number of attempts
+        stays bounded however full the keyspace gets.
+        """
+        length = code_length_for(VoteSession.objects.count())
+        for attempt in range(CODE_ATTEMPTS_PER_LENGTH * (MAX_CODE_LENGTH - length + 1)):
+            self.code = generate_random_code(min(MAX_CODE_LENGTH, length + attempt // CODE_ATTEMPTS_PER_LENGTH))
+            if VoteSession.objects.filter(code=self.code).exists():
+                continue
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                # Another request took the code between the check and the insert
+                if not VoteSession.objects.filter(code=self.code).exists():
+                    raise
+        self.code = ''
+        raise IntegrityError('Could not allocate a unique session code')
     
     def is_expired(self):
         return timezone.now() > self.expires_at
@@ -91,6 +225,155 @@ class Vote(models.Model):
         return f"{self.user.username} voted for {self.role.name} as {self.role.get_role_type_display()}"
 
 
+class Ballot(models.Model):
+    """Model representing one voter's choices in a session, packed into a single row"""
+    # Each category's chosen Role.position takes BITS bits of `choices`, in
+    # this order (0 means no vote). Only ever append to this list.
+    CATEGORIES = ['SPEAKER', 'EVALUATOR', 'TABLE_TOPICS']
+    BITS = 8
+    MAX_POSITION = 2 ** BITS - 1
+
+    # The unique constraint below leads with user, so no separate user index
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ballots', db_index=False)
+    vote_session = models.ForeignKey(VoteSession, on_delete=models.CASCADE, related_name='ballots')
+    choices = models.PositiveIntegerField()
+    cast_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'vote_session'], name='unique_ballot_per_voter'),
+        ]
+
+    @classmethod
+    def pack(cls, positions):
+        """Pack a {role_type: position} dict into a `choices` value"""
+        choices = 0
+        for role_type, position in positions.items():
+            if not 0 < position <= cls.MAX_POSITION:
+                raise ValueError(f'Position {position} does not fit in {cls.BITS} bits')
+            choices |= position << (cls.BITS * cls.CATEGORIES.index(role_type))
+        return choices
+
+    @classmethod
+    def unpack(cls, choices):
+        """Return the {role_type: position} dict packed into `choices`"""
+        positions = {}
+        for i, role_type in enumerate(cls.CATEGORIES):
+            position = (choices >> (cls.BITS * i)) & cls.MAX_POSITION
+            if position:
+                positions[role_type] = position
+        return positions
+
+    def __str__(self):
+        return f"{self.user.username}'s ballot in {self.vote_session.code}"
+
+
+class Participation(models.Model):
+    """
+    Records that a user voted in a session whose votes have been archived.
+
+    The retention sweep deletes a session's Vote and Ballot rows once it has
+    folded them into Role.archived_votes; these rows keep the session in the
+    voter's history.
+    """
+    # The unique constraint below leads with user, so no separate user index
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='participations', db_index=False)
+    vote_session = models.ForeignKey(VoteSession, on_delete=models.CASCADE, related_name='participations')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'vote_session'], name='unique_participation_per_voter'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} voted in {self.vote_session.code}"
+
+
+class BallotTokenManager(models.Manager):
+    def issue(self, vote_session, count):
+        """
+        Create `count` single-use tokens for `vote_session`, each with its own
+        guest user, and return ``[(token, plaintext)]``. Only the digest is
+        stored, so the plaintext codes can be shown just this once.
+        """
+        # Guests never log in: an unusable password costs no hashing
+        users = [
+            User(username=guest_username('guest', vote_session, secrets.token_hex(8)), password=make_password(None))
+            for _ in range(count)
+        ]
+        plaintexts = [BallotToken.generate() for _ in users]
+        with transaction.atomic():
+            # Concurrent batches for the session queue here, so labels don't repeat
+            lock_rows(VoteSession.objects.filter(pk=vote_session.pk))
+            start = self.filter(vote_session=vote_session).count() + 1
+            User.objects.bulk_create(users)
+            user_ids = dict(User.objects.filter(username__in=[u.username for u in users]).values_list('username', 'pk'))
+            tokens = self.bulk_create(
+                BallotToken(
+                    vote_session=vote_session,
+                    user_id=user_ids[user.username],
+                    label=f'Guest {n}',
+                    digest=BallotToken.digest_for(plaintext),
+                )
+                for n, user, plaintext in zip(range(start, start + count), users, plaintexts)
+            )
+        return list(zip(tokens, plaintexts))
+
+    def lookup(self, vote_session, plaintext):
+        """Return the token matching `plaintext` in `vote_session`, or None"""
+        digest = BallotToken.digest_for(plaintext)
+        # The unique index finds the row by digest; the plaintext itself is
+        # never compared, and the final check is constant-time
+        token = self.filter(digest=digest).select_related('user').first()
+        if token is None or token.vote_session_id != vote_session.pk:
+            return None
+        return token if constant_time_compare(token.digest, digest) else None
+
+
+class BallotToken(models.Model):
+    """Single-use code that lets a guest cast one ballot without an account"""
+    # No 0/O, 1/I/L: codes are read off paper and typed on phones
+    ALPHABET = 'ABCDEFGHJKMNPQRSTUVWXYZ23456789'
+    LENGTH = 10
+
+    vote_session = models.ForeignKey(VoteSession, on_delete=models.CASCADE, related_name='ballot_tokens')
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='ballot_token')
+    label = models.CharField(max_length=50)
+    digest = models.CharField(max_length=64, unique=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    used_at = models.DateTimeField(null=True, blank=True)
+
+    objects = BallotTokenManager()
+
+    @classmethod
+    def generate(cls):
+        return get_random_string(cls.LENGTH, cls.ALPHABET)
+
+    @classmethod
+    def normalize(cls, plaintext):
+        """Uppercase `plaintext` and drop the spaces and dashes people type"""
+        return ''.join(plaintext.split()).replace('-', '').upper()
+
+    @classmethod
+    def digest_for(cls, plaintext):
+        return salted_hmac('voting.BallotToken', cls.normalize(plaintext), algorithm='sha256').hexdigest()
+
+    @classmethod
+    def display(cls, plaintext):
+        """Format a code in two groups for printing, e.g. ABCDE-FGHJK"""
+        half = len(plaintext) // 2
+        return f'{plaintext[:half]}-{plaintext[half:]}'
+
+    def mark_used(self):
+        """Claim the token for one ballot; False if it was already used"""
+        # The condition makes the UPDATE the lock: two submissions cannot both win
+        claimed = BallotToken.objects.filter(pk=self.pk, used_at__isnull=True).update(used_at=timezone.now())
+        return claimed == 1
+
+    def __str__(self):
+        return f"{self.label} in {self.vote_session.code}"
+
+
 class AdminProfile(models.Model):
     """Model extending the User model for platform admins"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='admin_profile')
@@ -98,3 +381,142 @@ class AdminProfile(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {'Admin' if self.is_platform_admin else 'User'}"
+
+
+class GeneratedQuestionManager(models.Manager):
+    def find_near_duplicate(self, signature, since, threshold):
+        """Return the most similar question generated after `since`, if it is at least `threshold` similar"""
+        candidates = (
+            QuestionBand.objects
+            .filter(key__in=similarity.band_keys(signature), question__created_at__gte=since)
+            .values_list('question_id', 'question__signature')
+            .distinct()
+        )
+        best, best_score = None, threshold
+        for question_id, packed in candidates:
+            score = similarity.similarity(signature, similarity.unpack(packed))
+            if score >= best_score:
+                best, best_score = question_id, score
+        return self.get(pk=best) if best else None
+
+    def record(self, topic, text, signature):
+        """Store a generated question together with its LSH band keys"""
+        question = self.create(topic=topic, text=text, signature=similarity.pack(signature))
+        QuestionBand.objects.bulk_create(
+            QuestionBand(question=question, key=key) for key in similarity.band_keys(signature)
+        )
+        return question
+
+
+class GeneratedQuestion(models.Model):
+    """Model representing a Table Topics question returned by the AI"""
+    topic = models.CharField(max_length=200)
+    text = models.TextField()
+    signature = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    objects = GeneratedQuestionManager()
+
+    def __str__(self):
+        return f"{self.topic}: {self.text}"
+
+
+class QuestionBand(models.Model):
+    """Model representing one LSH band key of a generated question's MinHash signature"""
+    question = models.ForeignKey(GeneratedQuestion, on_delete=models.CASCADE, related_name='bands')
+    key = models.BigIntegerField(db_index=True)
+
+
+class JobManager(models.Manager):
+    def enqueue(self, name, payload=None, run_at=None, dedupe_key=None, max_attempts=None):
+        """
+        Queue the registered job `name` to run at `run_at` (default: now).
+
+        While a job with the same `dedupe_key` is queued or running, that job
+        is returned instead of queueing another one.
+        """
+        if dedupe_key:
+            existing = self.filter(dedupe_key=dedupe_key, status__in=Job.ACTIVE_STATUSES).first()
+            if existing:
+                return existing
+        try:
+            with transaction.atomic():
+                return self.create(
+                    name=name,
+                    payload=payload or {},
+                    run_at=run_at or timezone.now(),
+                    dedupe_key=dedupe_key,
+                    max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+                )
+        except IntegrityError:
+            # Another request queued the same job between our check and insert
+            return self.get(dedupe_key=dedupe_key, status__in=Job.ACTIVE_STATUSES)
+
+    def claim(self, worker, limit=1):
+        """Mark up to `limit` due jobs as running for `worker` and return them"""
+        now = timezone.now()
+        due = self.filter(status=Job.QUEUED, run_at__lte=now).order_by('run_at')
+        if connections[self.db].features.has_select_for_update_skip_locked:
+            # Postgres: rows another worker is claiming are skipped, not waited on
+            with transaction.atomic():
+                claimed = list(due.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+                self.filter(pk__in=claimed).update(status=Job.RUNNING, locked_by=worker, locked_at=now)
+            return list(self.filter(pk__in=claimed).order_by('run_at'))
+
+        claimed = []
+        for pk in due.values_list('pk', flat=True)[:limit * 4]:
+            # The status condition makes the UPDATE the lock: only one worker wins
+            if self.filter(pk=pk, status=Job.QUEUED).update(status=Job.RUNNING, locked_by=worker, locked_at=now):
+                claimed.append(pk)
+                if len(claimed) == limit:
+                    break
+        return list(self.filter(pk__in=claimed).order_by('run_at'))
+
+    def requeue_stale(self, lease):
+        """Return jobs whose worker died mid-run (running for longer than `lease`) to the queue"""
+        return self.filter(status=Job.RUNNING, locked_at__lt=timezone.now() - lease).update(
+            status=Job.QUEUED, locked_by='', locked_at=None
+        )
+
+
+class Job(models.Model):
+    """Model representing a unit of deferred work run by "manage.py run_jobs" """
+    QUEUED = 'QUEUED'
+    RUNNING = 'RUNNING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+    STATUSES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    dedupe_key = models.CharField(max_length=200, null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    last_error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    objects = JobManager()
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_at'])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=models.Q(status__in=['QUEUED', 'RUNNING']),
+                name='unique_active_job_dedupe_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
@@ -0,0 +1,42 @@
+"""
+Which pages the service worker (templates/voting/sw.js) may keep.
+
+Page responses carry an ``X-SW-Scope`` header naming who they were rendered
+for: ``anon`` for anonymous visitors, otherwise a digest of the login
+session. The service worker only stores pages with the header, only serves
+them back while the scope is unchanged, and drops every stored page when a
+response reports a different one (someone logged in or out on the device).
+
+Pages that embed a CSRF token get no header, so they are never stored: the
+token stops matching the cookie when it is rotated at login. Pages meant to
+work offline (vote, kiosk) set the cookie with ``ensure_csrf_cookie`` instead
+and their scripts read it when they post.
+"""
+from django.utils.crypto import salted_hmac
+
+SCOPE_HEADER = 'X-SW-Scope'
+CSRF_FIELD = b'name="csrfmiddlewaretoken"'
+
+
+def cache_scope(request):
+    if not request.user.is_authenticated:
+        return 'anon'
+    return salted_hmac('voting.offline.scope', request.session.session_key or '').hexdigest()[:16]
+
+
+class ServiceWorkerScopeMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            request.method == 'GET'
+            and response.status_code == 200
+            and not response.streaming
+            and response.get('Content-Type', '').startswith('text/html')
+            # {% csrf_token %}; scripts read the token from this field too
+            and CSRF_FIELD not in response.content
+        ):
+            response[SCOPE_HEADER] = cache_scope(request)
+        return response
@@ -0,0 +1,134 @@
+"""
+Token-bucket rate limiting shared across worker processes.
+
+Buckets live in a small SQLite file next to the main database, so every
+gunicorn/Passenger worker on the host sees the same counters without an
+external service. Each check is a single short write transaction on a
+per-thread connection, which keeps the overhead in the tens of microseconds.
+Buckets idle long enough to have refilled are deleted now and then, so the
+file holds the clients seen recently rather than every client ever seen.
+"""
+import random
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+
+
+_local = threading.local()
+
+# One consume() call in this many also deletes idle buckets
+PRUNE_EVERY = 1000
+
+
+def _connection():
+    """Return this thread's connection to the rate limit store"""
+    path = str(settings.RATELIMIT_DB)
+    conn = getattr(_local, 'conn', None)
+    # Reopened when the setting changes (tests point it at a scratch file)
+    if conn is None or _local.path != path:
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=OFF')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS bucket ('
+            'key TEXT PRIMARY KEY, tokens REAL NOT NULL, stamp REAL NOT NULL)'
+        )
+        _local.conn, _local.path = conn, path
+    return conn
+
+
+def consume(limits, now=None):
+    """
+    Take one token from each bucket in ``limits`` or from none of them.
+
+    ``limits`` is a list of ``(key, capacity, period)`` tuples, where a bucket
+    holds ``capacity`` tokens and refills completely every ``period`` seconds.
+    Returns 0 when the request is allowed, otherwise the number of seconds
+    until every bucket has a token again.
+    """
+    now = time.time() if now is None else now
+    conn = _connection()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        updates = []
+        retry_after = 0.0
+        for key, capacity, period in limits:
+            rate = capacity / period
+            row = conn.execute('SELECT tokens, stamp FROM bucket WHERE key = ?', (key,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            if tokens < 1:
+                retry_after = max(retry_after, (1 - tokens) / rate)
+            updates.append((key, tokens - 1, now))
+
+        if not retry_after:
+            conn.executemany('INSERT OR REPLACE INTO bucket (key, tokens, stamp) VALUES (?, ?, ?)', updates)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    if random.randrange(PRUNE_EVERY) == 0:
+        prune(now)
+    return retry_after
+
+
+def prune(now=None):
+    """
+    Delete buckets untouched for the longest configured period. They have
+    refilled completely, and a missing bucket counts as full.
+    """
+    now = time.time() if now is None else now
+    longest = max(period for config in settings.RATE_LIMITS.values() for _, period in config.values())
+    return _connection().execute('DELETE FROM bucket WHERE stamp < ?', (now - longest,)).rowcount
+
+
+def client_ip(request):
+    """
+    The client IP, from settings.RATELIMIT_IP_HEADER when behind a proxy.
+    In a list (X-Forwarded-For) only the last entry, appended by our own
+    proxy, is trusted; the ones before it come from the client.
+    """
+    ip = request.META.get(settings.RATELIMIT_IP_HEADER) or request.META.get('REMOTE_ADDR', '')
+    return ip.split(',')[-1].strip()
+
+
+def client_key(request):
+    """Identify the caller: the user id when logged in, otherwise the client IP"""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{client_ip(request)}'
+
+
+def rate_limit(scope):
+    """
+    Throttle a view with the per-client and global buckets configured in
+    ``settings.RATE_LIMITS[scope]``. Over-limit requests get a 429 response
+    with a ``Retry-After`` header.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            config = settings.RATE_LIMITS[scope]
+            if request.user.is_authenticated:
+                client_capacity, client_period = config['user']
+            else:
+                client_capacity, client_period = config['anonymous']
+            global_capacity, global_period = config['global']
+
+            retry_after = consume([
+                (f'{scope}:{client_key(request)}', client_capacity, client_period),
+                (f'{scope}:global', global_capacity, global_period),
+            ])
+            if retry_after:
+                response = JsonResponse(
+                    {'error': 'Too many requests. Please wait a moment and try again.'},
+                    status=429,
+                )
+                response['Retry-After'] = str(int(retry_after) + 1)
+                return response
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
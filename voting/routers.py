@@ -0,0 +1,93 @@
+"""
+Read/write database routing.
+
+Writes, and every read by default, go to the ``default`` database. Views
+decorated with ``replica_reads`` (results, dashboard, exports and the JSON
+status endpoints) read from ``settings.READ_DATABASE_ALIAS`` instead, when
+that alias is configured, so long report queries stay off the database that
+takes ballots.
+
+Replicas lag. A client that sent a write request (POST, PUT, PATCH, DELETE)
+gets a short-lived cookie from ReadReplicaMiddleware and reads from the
+primary until it expires, so it always sees its own ballot or change.
+"""
+import contextvars
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_pin'
+
+# Sessions are read on every request and written on login; keep them on the primary
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+
+
+def replica_configured():
+    return settings.READ_DATABASE_ALIAS in connections.databases
+
+
+def reading_from_replica():
+    """True while the current view's reads go to the replica"""
+    return _use_replica.get()
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return None
+        # Reads inside a write transaction must see that transaction
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return settings.READ_DATABASE_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+
+def _replica_iterator(iterator):
+    token = _use_replica.set(True)
+    try:
+        yield from iterator
+    finally:
+        _use_replica.reset(token)
+
+
+def replica_reads(view_func):
+    """Send the view's reads to the read replica unless the client is pinned to the primary"""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not replica_configured() or PIN_COOKIE in request.COOKIES:
+            return view_func(request, *args, **kwargs)
+        token = _use_replica.set(True)
+        try:
+            response = view_func(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+        if response.streaming:
+            # Streamed rows are read after the view returns
+            response.streaming_content = _replica_iterator(response.streaming_content)
+        return response
+    return wrapper
+
+
+class ReadReplicaMiddleware:
+    """Pin clients that just wrote to the primary for READ_REPLICA_PIN_SECONDS"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE') and replica_configured():
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.READ_REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax', secure=request.is_secure(),
+            )
+        return response
@@ -0,0 +1,201 @@
+"""
+Cheap rejection of session code scans.
+
+Every URL with a ``<code>`` argument can be walked by a scanner, and each
+miss used to cost a database query and a rendered 404. ScanGuardMiddleware
+runs before the view:
+
+- A per-process Bloom filter of every session code answers "definitely not
+  a session" with no database access; those requests get a pre-rendered 404.
+- Every miss (a Bloom negative, or a 404 from the view) takes a token from
+  the client's bucket in the shared rate limit store; once it is empty the
+  client gets a pre-rendered 429 for every unknown code until it refills.
+
+Valid codes are never blocked. New sessions reach other worker processes
+through a version token in the shared cache, bumped after each session is
+committed; a worker that sees a new token adds the codes created since it
+last looked, including ones whose ids it skipped because they committed
+late. Every SCAN_GUARD_RELOAD_SECONDS the filter is rebuilt from scratch.
+"""
+import hashlib
+import math
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from django.http import HttpResponse, JsonResponse
+from django.template import TemplateDoesNotExist
+from django.template.loader import render_to_string
+
+from .models import VoteSession
+from .ratelimit import client_ip, consume
+
+VERSION_KEY = 'scanguard:codes-version'
+# Skipped ids within this distance of the newest session are looked up again
+# on later loads; far more than can be mid-transaction at once
+GAP_WINDOW = 100
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on one BLAKE2b digest)"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(capacity, 1)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class CodeFilter:
+    """This process's Bloom filter of session codes, kept current through the shared cache"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.version = None
+        self.max_pk = 0
+        # Ids below max_pk not seen yet (id -> when first missed): on Postgres
+        # a transaction can commit after one that took a later id
+        self.gaps = {}
+        self.loaded_at = 0.0
+
+    def _load(self, bloom=None):
+        """Add codes of sessions created since the last load; returns the filter"""
+        if bloom is None:
+            total = VoteSession.objects.count()
+            # Room to grow before the false positive rate degrades
+            bloom = BloomFilter(total * 2 + 1024, settings.SCAN_GUARD_ERROR_RATE)
+            self.max_pk, self.gaps = 0, {}
+        new = models.Q(pk__gt=self.max_pk)
+        if self.gaps:
+            new |= models.Q(pk__in=list(self.gaps))
+        rows = VoteSession.objects.filter(new).order_by('pk').values_list('pk', 'code')
+
+        now = time.monotonic()
+        for pk, code in rows.iterator(chunk_size=5000):
+            bloom.add(code)
+            self.gaps.pop(pk, None)
+            if pk > self.max_pk:
+                self.gaps.update(dict.fromkeys(range(max(self.max_pk + 1, pk - GAP_WINDOW), pk), now))
+                self.max_pk = pk
+        # Older gaps are rolled back or deleted sessions; the periodic full
+        # reload picks up anything that still commits later
+        self.gaps = {
+            pk: seen for pk, seen in self.gaps.items()
+            if pk > self.max_pk - GAP_WINDOW and now - seen < settings.SCAN_GUARD_RELOAD_SECONDS
+        }
+        return bloom
+
+    def refresh(self):
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            # Evicted or never set: start a new one so every process reloads
+            cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(VERSION_KEY)
+        if self.is_current(version):
+            return
+        with self.lock:
+            if self.is_current(version):
+                return
+            if self.is_expired() or self.bloom.count >= self.bloom.capacity:
+                self.bloom = self._load()
+                self.loaded_at = time.monotonic()
+            else:
+                self._load(self.bloom)
+            self.version = version
+
+    def is_expired(self):
+        """Due for the periodic full reload, which also drops deleted codes"""
+        return self.bloom is None or time.monotonic() - self.loaded_at >= settings.SCAN_GUARD_RELOAD_SECONDS
+
+    def is_current(self, version):
+        # The periodic reload covers a cache that lost or never shared the version
+        return version == self.version and not self.is_expired()
+
+    def might_exist(self, code):
+        self.refresh()
+        return code in self.bloom
+
+
+codes = CodeFilter()
+
+
+def publish_new_codes():
+    """Tell every process to pick up newly committed sessions"""
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+_pages = {}
+
+
+def _page(status, api):
+    """Pre-rendered 404/429 bodies, built once per process"""
+    key = (status, api)
+    if key not in _pages:
+        if api:
+            body = JsonResponse({'error': 'Session not found.' if status == 404 else 'Too many requests.'}).content
+        else:
+            try:
+                body = render_to_string(f'{status}.html').encode()
+            except TemplateDoesNotExist:
+                title = 'Not Found' if status == 404 else 'Too Many Requests'
+                body = f'<!doctype html><title>{title}</title><h1>{title}</h1>'.encode()
+        _pages[key] = body
+    return _pages[key]
+
+
+def _reject(request, status, retry_after=0):
+    api = request.path.startswith('/api/')
+    response = HttpResponse(_page(status, api), status=status,
+                            content_type='application/json' if api else 'text/html; charset=utf-8')
+    if retry_after:
+        response['Retry-After'] = str(int(retry_after) + 1)
+    return response
+
+
+def record_miss(request):
+    """Count one unknown-code request against the client; returns seconds until it may miss again, or 0"""
+    capacity, period = settings.SCAN_GUARD_MISSES
+    return consume([(f'scan:{client_ip(request)}', capacity, period)])
+
+
+class ScanGuardMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if getattr(request, 'scan_guard_code', None) and response.status_code == 404:
+            # The filter said maybe, the view said no: still a miss
+            record_miss(request)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        code = view_kwargs.get('code')
+        if not settings.SCAN_GUARD_ENABLED or code is None:
+            return None
+        if codes.might_exist(code):
+            request.scan_guard_code = code
+            return None
+        retry_after = record_miss(request)
+        if retry_after:
+            return _reject(request, 429, retry_after)
+        return _reject(request, 404)
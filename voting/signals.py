@@ -0,0 +1,72 @@
+"""
+Invalidate what is cached about a session when its data changes.
+
+Template fragments are keyed by ``VoteSession.state_version``, so bumping it
+makes every worker miss on the old keys; saving the session itself bumps it
+in ``VoteSession.save``, and state transitions in
+``VoteSession.objects.transition``. Other cached data (tallies) is tagged
+with the session and evicted through the cache backend's tag support, once
+the change has committed: evicted any earlier, a concurrent reader could
+cache the pre-commit state again.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from . import scanguard
+from .cache import invalidate_tags, session_tag
+from .models import Ballot, Role, Vote, VoteSession
+
+
+# Sent by VoteSession.objects.transition after a state change commits, with
+# ``session_id`` and ``state`` (the changed fields and new state_version)
+session_state_changed = Signal()
+
+
+def bump_state_version(session_id, **filters):
+    """Increment the state version of a session, optionally only if it matches `filters`"""
+    VoteSession.objects.filter(pk=session_id, **filters).update(state_version=F('state_version') + 1)
+
+
+def invalidate_session(session_id):
+    """Evict the session's tagged cache entries when the current transaction commits"""
+    transaction.on_commit(lambda: invalidate_tags(session_tag(session_id)))
+
+
+@receiver(post_save, sender=VoteSession)
+@receiver(post_delete, sender=VoteSession)
+def session_changed(sender, instance, **kwargs):
+    invalidate_session(instance.pk)
+    if kwargs.get('created'):
+        # After commit, so no worker reloads its code filter without the new row
+        transaction.on_commit(scanguard.publish_new_codes)
+
+
+@receiver(session_state_changed, sender=VoteSession)
+def session_transitioned(sender, session_id, **kwargs):
+    invalidate_tags(session_tag(session_id))
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def role_changed(sender, instance, **kwargs):
+    # Roles make up the participant list and the ballot choices
+    bump_state_version(instance.vote_session_id)
+    invalidate_session(instance.vote_session_id)
+
+
+@receiver(post_save, sender=Vote)
+@receiver(post_save, sender=Ballot)
+def vote_saved(sender, instance, **kwargs):
+    # Only the closed-session results are fragment-cached, so votes cast
+    # while polls are open leave the version alone
+    bump_state_version(instance.vote_session_id, polls_closed=True)
+    invalidate_session(instance.vote_session_id)
+
+
+@receiver(post_delete, sender=Vote)
+@receiver(post_delete, sender=Ballot)
+def vote_deleted(sender, instance, **kwargs):
+    bump_state_version(instance.vote_session_id)
+    invalidate_session(instance.vote_session_id)
@@ -0,0 +1,80 @@
+"""
+MinHash signatures and LSH band keys for spotting near-duplicate questions.
+
+A question is reduced to overlapping character shingles, summarised by a
+fixed-size MinHash signature, and split into bands. Two questions that share
+any band key are candidates; their signatures then estimate how similar they
+really are. This keeps duplicate checks to a single indexed lookup instead of
+comparing against every stored question.
+"""
+import hashlib
+import random
+import re
+import struct
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 5
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_SIGNATURE_FORMAT = f'<{NUM_PERMUTATIONS}I'
+
+# Fixed seed so signatures stay comparable across processes and deploys
+_rng = random.Random(0x70A57)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+
+def normalize(text):
+    """Lowercase the text and collapse punctuation and whitespace"""
+    return ' '.join(re.findall(r'[a-z0-9]+', text.lower()))
+
+
+def shingles(text):
+    """Return the set of character shingles of the normalized text"""
+    text = normalize(text)
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'little')
+
+
+def minhash(text):
+    """Compute the MinHash signature of a text as a tuple of 32-bit ints"""
+    hashes = [_hash(s) for s in shingles(text)]
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def band_keys(signature):
+    """Split a signature into LSH bands, returning one signed 64-bit key per band"""
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(struct.pack(f'<I{ROWS_PER_BAND}I', band, *rows), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'little', signed=True))
+    return keys
+
+
+def similarity(sig_a, sig_b):
+    """Estimate the Jaccard similarity of two texts from their signatures"""
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / NUM_PERMUTATIONS
+
+
+def pack(signature):
+    """Serialize a signature for storage in a BinaryField"""
+    return struct.pack(_SIGNATURE_FORMAT, *signature)
+
+
+def unpack(data):
+    """Deserialize a signature stored with pack()"""
+    return struct.unpack(_SIGNATURE_FORMAT, bytes(data))
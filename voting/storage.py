@@ -0,0 +1,270 @@
+"""
+How ballots are written and read back.
+
+``settings.VOTE_STORAGE`` picks the format new ballots are written in:
+
+- ``'rows'``: one ``Vote`` row per category (the original layout)
+- ``'ballots'``: one ``Ballot`` row per voter, choices packed into an integer
+
+Reads always consult both tables, so switching modes, or converting data
+with "manage.py convert_votes", never hides a vote.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+
+from .models import Ballot, Participation, Role, Vote, VoteSession, lock_rows
+
+
+def choose_roles(roles, role_ids):
+    """
+    Resolve a submitted list of role ids against ``roles`` ({pk: Role}).
+    Returns ``(chosen roles, None)`` or ``(None, error message)``.
+    """
+    if not roles:
+        return None, 'this session has no participants'
+    if not isinstance(role_ids, list) or not all(isinstance(pk, int) for pk in role_ids):
+        return None, 'roles must be a list of role ids'
+    chosen = [roles.get(pk) for pk in role_ids]
+    if None in chosen:
+        return None, 'unknown role'
+    if sorted(role.role_type for role in chosen) != sorted({role.role_type for role in roles.values()}):
+        return None, 'choose exactly one participant in each category'
+    return chosen, None
+
+
+def cast(user, vote_session, roles):
+    """Record one voter's choice of ``roles`` (one per category) in ``vote_session``"""
+    if settings.VOTE_STORAGE == 'ballots' and all(role.position <= Ballot.MAX_POSITION for role in roles):
+        Ballot.objects.create(
+            user=user,
+            vote_session=vote_session,
+            choices=Ballot.pack({role.role_type: role.position for role in roles}),
+        )
+        return
+    # Row storage, also the fallback for positions too large to pack
+    with transaction.atomic():
+        for role in roles:
+            Vote(user=user, role=role, vote_session=vote_session).save()
+
+
+def cast_once(user, vote_session, roles):
+    """
+    Record the ballot unless the voter already has one in the session.
+    Returns True if it was recorded.
+
+    Concurrent submissions by one voter queue on the voter's lock, so the
+    check and the insert cannot interleave. The per-voter unique constraint
+    only covers packed ballots; row storage relies on this lock.
+    """
+    with transaction.atomic():
+        lock_rows(User.objects.filter(pk=user.pk))
+        if has_voted(user, vote_session):
+            return False
+        cast(user, vote_session, roles)
+    return True
+
+
+def cast_many(vote_session, ballots):
+    """
+    Record many ballots, given as ``[(user, roles)]``, with bulk inserts.
+
+    Ballots that would duplicate a stored one are ignored. No per-row
+    signals are sent, so the caller invalidates the session's caches once.
+    """
+    packed, rows = [], []
+    for user, roles in ballots:
+        if settings.VOTE_STORAGE == 'ballots' and all(role.position <= Ballot.MAX_POSITION for role in roles):
+            packed.append(Ballot(
+                user=user,
+                vote_session=vote_session,
+                choices=Ballot.pack({role.role_type: role.position for role in roles}),
+            ))
+        else:
+            rows.extend(Vote(user=user, role=role, vote_session=vote_session) for role in roles)
+    with transaction.atomic():
+        Ballot.objects.bulk_create(packed, ignore_conflicts=True)
+        Vote.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+def has_voted(user, vote_session):
+    # Participation is only written when a session is archived, so live
+    # sessions are answered by the first two queries for anyone who voted
+    return (
+        Ballot.objects.filter(user=user, vote_session=vote_session).exists()
+        or Vote.objects.filter(user=user, vote_session=vote_session).exists()
+        or Participation.objects.filter(user=user, vote_session=vote_session).exists()
+    )
+
+
+def sessions_voted_in(user):
+    """Queryset of the sessions ``user`` has voted in, archived ones included"""
+    return VoteSession.objects.filter(
+        Q(pk__in=Vote.objects.filter(user=user).values('vote_session_id'))
+        | Q(pk__in=Ballot.objects.filter(user=user).values('vote_session_id'))
+        | Q(pk__in=Participation.objects.filter(user=user).values('vote_session_id'))
+    )
+
+
+def role_counts(vote_session, roles=None):
+    """Return a Counter of live votes per role id (archived votes not included)"""
+    counts = Counter(dict(
+        Vote.objects.filter(vote_session=vote_session)
+        .values('role_id')
+        .annotate(n=Count('pk'))
+        .values_list('role_id', 'n')
+    ))
+    # Identical ballots are counted once by the database
+    packed = (
+        Ballot.objects.filter(vote_session=vote_session)
+        .values('choices')
+        .annotate(n=Count('pk'))
+        .values_list('choices', 'n')
+    )
+    if packed:
+        role_ids = _role_ids_by_position(vote_session, roles)
+        for choices, n in packed:
+            for role_type, position in Ballot.unpack(choices).items():
+                role_id = role_ids.get((role_type, position))
+                if role_id is not None:
+                    counts[role_id] += n
+    return counts
+
+
+def iter_votes(vote_session, chunk_size=2000):
+    """
+    Yield ``(username, role_id, cast_at)`` for every live vote in the session,
+    whichever table it is stored in. Rows are fetched ``chunk_size`` at a time.
+    """
+    yield from (
+        Vote.objects.filter(vote_session=vote_session).order_by('pk')
+        .values_list('user__username', 'role_id', 'timestamp').iterator(chunk_size=chunk_size)
+    )
+    role_ids = None
+    for username, choices, cast_at in (
+        Ballot.objects.filter(vote_session=vote_session).order_by('pk')
+        .values_list('user__username', 'choices', 'cast_at').iterator(chunk_size=chunk_size)
+    ):
+        if role_ids is None:
+            role_ids = _role_ids_by_position(vote_session)
+        for role_type, position in Ballot.unpack(choices).items():
+            role_id = role_ids.get((role_type, position))
+            if role_id is not None:
+                yield username, role_id, cast_at
+
+
+def _role_ids_by_position(vote_session, roles=None):
+    if roles is None:
+        roles = Role.objects.filter(vote_session=vote_session).values_list('role_type', 'position', 'pk')
+    else:
+        roles = [(role.role_type, role.position, role.pk) for role in roles]
+    return {(role_type, position): pk for role_type, position, pk in roles}
+
+
+def raw_delete(model, pks):
+    """
+    Delete rows by primary key without loading them or sending signals.
+
+    Used for bulk moves where the per-row post_delete cache handlers would
+    cost one UPDATE each for no visible change.
+    """
+    placeholders = ', '.join(['%s'] * len(pks))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {model._meta.db_table} WHERE {model._meta.pk.column} IN ({placeholders})', pks)
+
+
+def convert_rows_to_ballots(vote_model, ballot_model, batch_size=500):
+    """
+    Move ``Vote`` rows into packed ``Ballot`` rows, one voter-session batch
+    per transaction. Returns the number of ballots written.
+    """
+    written = 0
+    last = (0, 0)
+    while True:
+        groups = list(
+            vote_model.objects
+            .filter(Q(vote_session_id__gt=last[0]) | Q(vote_session_id=last[0], user_id__gt=last[1]))
+            .order_by('vote_session_id', 'user_id')
+            .values_list('vote_session_id', 'user_id')
+            .distinct()[:batch_size]
+        )
+        if not groups:
+            return written
+        last = groups[-1]
+
+        wanted = set(groups)
+        sessions, users = {g[0] for g in groups}, {g[1] for g in groups}
+        with transaction.atomic():
+            votes = {}
+            for pk, session_id, user_id, role_type, position, timestamp in (
+                vote_model.objects
+                .filter(vote_session_id__in=sessions, user_id__in=users)
+                .values_list('pk', 'vote_session_id', 'user_id', 'role__role_type', 'role__position', 'timestamp')
+            ):
+                if (session_id, user_id) in wanted:
+                    votes.setdefault((session_id, user_id), []).append((pk, role_type, position, timestamp))
+
+            already = set(
+                ballot_model.objects
+                .filter(vote_session_id__in=sessions, user_id__in=users)
+                .values_list('vote_session_id', 'user_id')
+            )
+            ballots, moved = [], []
+            for (session_id, user_id), rows in votes.items():
+                # Voters with a packed ballot already, or positions too large
+                # to pack, keep their rows
+                if (session_id, user_id) in already or any(row[2] > Ballot.MAX_POSITION for row in rows):
+                    continue
+                ballots.append(ballot_model(
+                    vote_session_id=session_id,
+                    user_id=user_id,
+                    choices=Ballot.pack({role_type: position for _, role_type, position, _ in rows}),
+                    cast_at=min(row[3] for row in rows),
+                ))
+                moved.extend(row[0] for row in rows)
+            ballot_model.objects.bulk_create(ballots)
+            if moved:
+                raw_delete(vote_model, moved)
+        written += len(ballots)
+
+
+def convert_ballots_to_rows(ballot_model, vote_model, role_model, batch_size=500):
+    """Move packed ``Ballot`` rows back into ``Vote`` rows; returns the number of ballots moved"""
+    moved = 0
+    while True:
+        with transaction.atomic():
+            ballots = list(ballot_model.objects.order_by('pk')[:batch_size])
+            if not ballots:
+                return moved
+            role_ids = {
+                (session_id, role_type, position): pk
+                for session_id, role_type, position, pk in role_model.objects
+                .filter(vote_session_id__in={b.vote_session_id for b in ballots})
+                .values_list('vote_session_id', 'role_type', 'position', 'pk')
+            }
+            votes = []
+            for ballot in ballots:
+                for role_type, position in Ballot.unpack(ballot.choices).items():
+                    role_id = role_ids.get((ballot.vote_session_id, role_type, position))
+                    if role_id is not None:
+                        votes.append(vote_model(
+                            user_id=ballot.user_id, vote_session_id=ballot.vote_session_id,
+                            role_id=role_id, timestamp=ballot.cast_at,
+                        ))
+            vote_model.objects.bulk_create(votes, ignore_conflicts=True)
+            # bulk_create stamps auto_now_add fields with the current time.
+            # Only the batch's own (session, voter) pairs have a ballot to copy
+            # from; other rows of the same sessions or voters keep theirs.
+            pairs = Q()
+            for ballot in ballots:
+                pairs |= Q(vote_session_id=ballot.vote_session_id, user_id=ballot.user_id)
+            vote_model.objects.filter(pairs).update(timestamp=Subquery(
+                ballot_model.objects
+                .filter(vote_session_id=OuterRef('vote_session_id'), user_id=OuterRef('user_id'))
+                .values('cast_at')[:1]
+            ))
+            raw_delete(ballot_model, [ballot.pk for ballot in ballots])
+        moved += len(ballots)
@@ -0,0 +1,27 @@
+"""
+Handlers for the background jobs run by "manage.py run_jobs".
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .jobs import job
+from .models import GeneratedQuestion, VoteSession
+
+
+@job('warm_results')
+def warm_results(session_id):
+    """Tally a closed session into the shared cache before anyone opens its results"""
+    from .views import cached_tally
+
+    vote_session = VoteSession.objects.filter(pk=session_id).first()
+    if vote_session is not None:
+        cached_tally(vote_session)
+
+
+@job('prune_generated_questions')
+def prune_generated_questions():
+    """Delete AI questions too old to count as repeats (their LSH bands cascade)"""
+    cutoff = timezone.now() - timedelta(days=settings.TABLETOPICS_DUPLICATE_WINDOW_DAYS)
+    GeneratedQuestion.objects.filter(created_at__lt=cutoff).delete()
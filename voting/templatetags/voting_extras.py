@@ -1,9 +1,17 @@
 from django import template
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from functools import lru_cache
 from itertools import groupby
 from operator import attrgetter
+import json
 
 register = template.Library()
 
+# Written by "manage.py build_images"
+RESPONSIVE_MANIFEST = 'voting/images/responsive/manifest.json'
+
 @register.filter
 def groupby_attr(objects, attribute):
     """
@@ -27,3 +35,38 @@ def get_field(form, field_name):
         return form[field_name]
     except KeyError:
         return None
+
+
+@lru_cache(maxsize=None)
+def _responsive_variants():
+    path = finders.find(RESPONSIVE_MANIFEST)
+    if not path:
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+@register.simple_tag
+def responsive_image(path, alt, sizes='100vw', **attrs):
+    """
+    Render a <picture> offering WebP and PNG variants of a static image so
+    browsers download the smallest one that fits.
+
+    Usage: {% responsive_image 'voting/images/vote-icon.png' 'Vote Icon' sizes='80px' class='img-fluid' %}
+    """
+    variants = _responsive_variants().get(path)
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    extra = format_html_join('', ' {}="{}"', sorted(attrs.items()))
+    if not variants:
+        return format_html('<img src="{}" alt="{}"{}>', static(path), alt, extra)
+
+    def srcset(fmt):
+        return ', '.join(f"{static(v[fmt])} {v['width']}w" for v in variants)
+
+    largest = variants[-1]
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}"{}></picture>',
+        srcset('webp'), sizes, static(largest['png']), srcset('png'), sizes, alt, extra,
+    )
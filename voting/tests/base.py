@@ -0,0 +1,51 @@
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from ..benchmarks import isolated_cache
+from ..models import AdminProfile, Role, VoteSession
+
+
+def make_session(owner=None, positions=2, **fields):
+    """A session with `positions` participants in every category"""
+    if owner is None:
+        owner = User.objects.create_user('owner')
+        AdminProfile.objects.create(user=owner, is_platform_admin=True)
+    vote_session = VoteSession.objects.create(title='Test', created_by=owner, **fields)
+    Role.objects.bulk_create(
+        Role(vote_session=vote_session, role_type=role_type, position=position, name=f'{role_type} {position}')
+        for role_type, _ in Role.ROLE_TYPES
+        for position in range(1, positions + 1)
+    )
+    return vote_session
+
+
+def ballot(vote_session, position):
+    """One choice per category, all at `position`"""
+    return list(vote_session.roles.filter(position=position).order_by('role_type'))
+
+
+@contextmanager
+def scratch_ratelimit_store():
+    with tempfile.TemporaryDirectory() as directory:
+        with override_settings(RATELIMIT_DB=Path(directory) / 'ratelimit.sqlite3'):
+            yield
+
+
+# TestCase never commits, so new codes would never reach the scan guard's
+# filter (it reloads on commit); ScanGuardTests turns it back on. Pages are
+# rendered without running collectstatic first.
+@override_settings(
+    SCAN_GUARD_ENABLED=False,
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+)
+class VotingTestCase(TestCase):
+    def setUp(self):
+        # Rolled-back primary keys are reused: keep each test's cache entries
+        # (and rate limit buckets) to itself
+        for context in (isolated_cache(), scratch_ratelimit_store()):
+            context.__enter__()
+            self.addCleanup(context.__exit__, None, None, None)
@@ -0,0 +1,30 @@
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+
+from ..models import AdminProfile
+from .base import VotingTestCase
+
+
+@override_settings(MEMBER_IMPORT_MAX_PASSWORDS=2)
+class MemberImportPageTests(VotingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('root', password='a-long-passphrase-9'))
+        self.url = reverse('admin:voting_adminprofile_import')
+
+    def upload(self, text):
+        return self.client.post(self.url, {'csv_file': SimpleUploadedFile('members.csv', text.encode())})
+
+    def test_rejects_files_with_too_many_passwords(self):
+        response = self.upload('username,password\nana,pw-one-1234\nben,pw-two-1234\ncy,pw-three-1234\n')
+        self.assertContains(response, 'one upload can hash at most 2')
+        self.assertFalse(User.objects.filter(username='ana').exists())
+
+    def test_imports_within_the_limit(self):
+        response = self.upload('username,password,admin\nana,pw-one-1234,yes\nben,,\ncy,,\n')
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(User.objects.get(username='ana').check_password('pw-one-1234'))
+        self.assertTrue(AdminProfile.objects.get(user__username='ana').is_platform_admin)
+        self.assertFalse(User.objects.get(username='cy').has_usable_password())
@@ -0,0 +1,30 @@
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from .. import storage
+from ..models import VoteSession
+from .base import VotingTestCase, ballot, make_session
+
+
+class ApiResultsTests(VotingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.vote_session = make_session()
+        for i, position in enumerate((1, 1, 2)):
+            storage.cast(User.objects.create_user(f'voter{i}'), self.vote_session, ballot(self.vote_session, position))
+        VoteSession.objects.transition(self.vote_session.pk, polls_closed=True)
+        self.url = reverse('api_session_results', args=[self.vote_session.code])
+
+    def test_requires_login(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_voters_see_winners_only(self):
+        self.client.force_login(User.objects.get(username='voter0'))
+        results = self.client.get(self.url).json()['results']
+        self.assertTrue(all(len(result['votes']) == 1 for result in results))
+        self.assertEqual(results[0]['votes'][0]['count'], 2)
+
+    def test_owner_sees_every_count(self):
+        self.client.force_login(self.vote_session.created_by)
+        results = self.client.get(self.url).json()['results']
+        self.assertEqual([vote['count'] for vote in results[0]['votes']], [2, 1])
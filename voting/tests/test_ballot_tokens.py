@@ -0,0 +1,36 @@
+from django.urls import reverse
+
+from .. import storage
+from ..forms import UserRegistrationForm
+from ..models import BallotToken, Role
+from .base import VotingTestCase, ballot, make_session
+
+
+class BallotTokenTests(VotingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.vote_session = make_session()
+
+    def test_batches_get_distinct_guests_and_labels(self):
+        first = BallotToken.objects.issue(self.vote_session, 3)
+        second = BallotToken.objects.issue(self.vote_session, 2)
+        tokens = [token for token, _ in first + second]
+        self.assertEqual([token.label for token in tokens], [f'Guest {n}' for n in range(1, 6)])
+        self.assertEqual(len({token.user.username for token in tokens}), 5)
+
+    def test_guest_usernames_cannot_be_registered(self):
+        (token, _), = BallotToken.objects.issue(self.vote_session, 1)
+        form = UserRegistrationForm({
+            'username': token.user.username, 'first_name': 'A', 'last_name': 'B', 'email': 'a@example.com',
+            'password1': 'a-long-passphrase-9', 'password2': 'a-long-passphrase-9',
+        })
+        self.assertIn('username', form.errors)
+
+    def test_token_redeems_once(self):
+        (_, plaintext), = BallotToken.objects.issue(self.vote_session, 1)
+        url = reverse('api_submit_ballot', args=[self.vote_session.code])
+        data = {'token': plaintext, 'roles': [role.pk for role in ballot(self.vote_session, 1)]}
+        self.assertEqual(self.client.post(url, data, content_type='application/json').status_code, 201)
+        self.assertEqual(self.client.post(url, data, content_type='application/json').status_code, 409)
+        self.assertEqual(sum(storage.role_counts(self.vote_session).values()), len(Role.ROLE_TYPES))
+        self.assertIsNone(BallotToken.objects.lookup(self.vote_session, 'not-a-code'))
@@ -0,0 +1,94 @@
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from .. import storage
+from ..models import Ballot, Role, Vote
+from .base import VotingTestCase, ballot, make_session
+
+
+class ConvertVotesTests(VotingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.voter = User.objects.create_user('voter')
+        self.rows_session = make_session()
+        self.ballots_session = make_session(owner=self.rows_session.created_by)
+
+    def test_round_trip_keeps_every_vote_and_timestamp(self):
+        with override_settings(VOTE_STORAGE='rows'):
+            storage.cast(self.voter, self.rows_session, ballot(self.rows_session, 1))
+        with override_settings(VOTE_STORAGE='ballots'):
+            storage.cast(self.voter, self.ballots_session, ballot(self.ballots_session, 2))
+            # Puts (rows session, voter) in the batch's sessions x voters, without a ballot
+            storage.cast(User.objects.create_user('other'), self.rows_session, ballot(self.rows_session, 1))
+        cast_at = Ballot.objects.get(user=self.voter).cast_at
+        row_times = set(Vote.objects.values_list('timestamp', flat=True))
+
+        self.assertEqual(storage.convert_ballots_to_rows(Ballot, Vote, Role), 2)
+        self.assertFalse(Ballot.objects.exists())
+        self.assertEqual(
+            set(Vote.objects.filter(vote_session=self.ballots_session).values_list('timestamp', flat=True)), {cast_at},
+        )
+        # Rows of the voter's other session are not the batch's to touch
+        self.assertEqual(
+            set(Vote.objects.filter(vote_session=self.rows_session, user=self.voter).values_list('timestamp', flat=True)),
+            row_times,
+        )
+
+        self.assertEqual(storage.convert_rows_to_ballots(Vote, Ballot), 3)
+        self.assertFalse(Vote.objects.exists())
+        self.assertEqual(Ballot.objects.get(vote_session=self.ballots_session).cast_at, cast_at)
+        for vote_session, position, voters in ((self.rows_session, 1, 2), (self.ballots_session, 2, 1)):
+            counts = storage.role_counts(vote_session, list(vote_session.roles.all()))
+            self.assertEqual(
+                {pk: count for pk, count in counts.items() if count},
+                {role.pk: voters for role in ballot(vote_session, position)},
+            )
+
+
+class BallotPackingTests(SimpleTestCase):
+    def test_round_trip(self):
+        positions = {'SPEAKER': 3, 'TABLE_TOPICS': Ballot.MAX_POSITION}
+        self.assertEqual(Ballot.unpack(Ballot.pack(positions)), positions)
+        self.assertEqual(Ballot.unpack(0), {})
+
+    def test_positions_must_fit(self):
+        for position in (0, Ballot.MAX_POSITION + 1):
+            with self.assertRaises(ValueError):
+                Ballot.pack({'SPEAKER': position})
+
+
+@override_settings(VOTE_STORAGE='ballots')
+class PackedRoleTests(VotingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.vote_session = make_session()
+        self.role = ballot(self.vote_session, 1)[0]
+
+    def test_roles_are_editable_until_the_first_ballot(self):
+        self.role.position = 3
+        self.role.full_clean()
+        self.role.position = 1
+
+        storage.cast(User.objects.create_user('voter'), self.vote_session, ballot(self.vote_session, 1))
+        self.role.name = 'Renamed'
+        self.role.full_clean()
+        self.role.position = 2
+        with self.assertRaises(ValidationError):
+            self.role.full_clean()
+
+    def test_admin_keeps_packed_votes_on_their_role(self):
+        storage.cast(User.objects.create_user('voter'), self.vote_session, ballot(self.vote_session, 1))
+        self.client.force_login(User.objects.create_superuser('root'))
+        change_url = reverse('admin:voting_role_change', args=[self.role.pk])
+        self.client.post(change_url, {'name': 'Renamed', 'role_type': self.role.role_type, 'position': 2})
+        self.role.refresh_from_db()
+        self.assertEqual((self.role.name, self.role.position), ('Renamed', 1))
+        self.assertEqual(self.client.get(reverse('admin:voting_role_delete', args=[self.role.pk])).status_code, 403)
+
+        self.client.post(reverse('admin:voting_role_changelist'), {
+            'action': 'delete_selected', 'post': 'yes', '_selected_action': [self.role.pk],
+        })
+        self.assertTrue(Role.objects.filter(pk=self.role.pk).exists())
+        self.assertEqual(storage.role_counts(self.vote_session)[self.role.pk], 1)
@@ -0,0 +1,69 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.urls import reverse
+
+from .. import storage
+from ..cache import invalidate_tags, session_tag
+from ..models import VoteSession
+from ..views import cached_tally
+from .base import VotingTestCase, ballot, make_session
+
+
+class CacheInvalidationTests(VotingTestCase):
+    def test_tally_is_evicted_only_after_commit(self):
+        vote_session = make_session()
+        VoteSession.objects.transition(vote_session.pk, polls_closed=True)
+        cached_tally(vote_session)
+        with self.captureOnCommitCallbacks(execute=True):
+            storage.cast(User.objects.create_user('voter'), vote_session, ballot(vote_session, 1))
+            # Still the committed state until the ballot commits
+            self.assertIsNotNone(cache.get(f'tally:{vote_session.pk}'))
+        self.assertIsNone(cache.get(f'tally:{vote_session.pk}'))
+        self.assertEqual(sum(vote['count'] for vote in cached_tally(vote_session)['SPEAKER']['votes']), 1)
+
+    def test_writes_that_change_nothing_keep_front_caches(self):
+        cache.set('kept', 1)
+        self.assertEqual(cache.get('kept'), 1)
+        state = cache._state()
+        generation = state.generation()
+        invalidate_tags(session_tag(0))
+        self.assertEqual(state.generation(), generation)
+        self.assertIn(cache.make_key('kept'), state.front)
+        cache.delete('kept')
+        self.assertNotEqual(state.generation(), generation)
+
+
+class FragmentCacheTests(VotingTestCase):
+    """Closing polls and toggling results must move pages off their cached fragments"""
+
+    def setUp(self):
+        super().setUp()
+        self.vote_session = make_session()
+        self.client.force_login(self.vote_session.created_by)
+
+    def poison(self, fragment, *vary_on):
+        """Plant a marker where the page's current fragment is cached"""
+        version = VoteSession.objects.get(pk=self.vote_session.pk).state_version
+        # The templates quote fragment names, and {% cache %} keeps the quotes
+        cache.set(make_template_fragment_key(f"'{fragment}'", [self.vote_session.pk, version, *vary_on]), 'STALE FRAGMENT')
+
+    def test_toggling_results_rerenders_the_results(self):
+        storage.cast(User.objects.create_user('voter'), self.vote_session, ballot(self.vote_session, 1))
+        self.client.post(reverse('close_polls', args=[self.vote_session.code]))
+        url = reverse('results', args=[self.vote_session.code])
+        self.poison('results', True)
+        self.assertContains(self.client.get(url), 'STALE FRAGMENT')
+        self.client.post(reverse('toggle_results', args=[self.vote_session.code]))
+        response = self.client.get(url)
+        self.assertNotContains(response, 'STALE FRAGMENT')
+        self.assertContains(response, 'SPEAKER 1')
+
+    def test_closing_polls_rerenders_the_participants(self):
+        url = reverse('manage_session', args=[self.vote_session.code])
+        self.poison('participants')
+        self.assertContains(self.client.get(url), 'STALE FRAGMENT')
+        self.client.post(reverse('close_polls', args=[self.vote_session.code]))
+        response = self.client.get(url)
+        self.assertNotContains(response, 'STALE FRAGMENT')
+        self.assertContains(response, 'SPEAKER 1')
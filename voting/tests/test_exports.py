@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import storage
+from ..models import AdminProfile, VoteSession
+from .base import VotingTestCase, ballot, make_session
+
+
+class ExportTests(VotingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.vote_session = make_session()
+        for i, position in enumerate((1, 1, 2)):
+            storage.cast(User.objects.create_user(f'voter{i}'), self.vote_session, ballot(self.vote_session, position))
+
+    def export_url(self, kind, fmt):
+        return reverse('export_session', args=[self.vote_session.code, kind, fmt])
+
+    def test_ledger_streams_one_csv_row_per_vote(self):
+        self.client.force_login(self.vote_session.created_by)
+        response = self.client.get(self.export_url('votes', 'csv'))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn(f'{self.vote_session.code}-votes.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 9)
+        self.assertEqual({row['voter'] for row in rows}, {'voter0', 'voter1', 'voter2'})
+
+    def test_results_stream_as_ndjson(self):
+        self.client.force_login(self.vote_session.created_by)
+        response = self.client.get(self.export_url('results', 'ndjson'))
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        speakers = {row['role']: (row['votes'], row['winner']) for row in rows if row['role_type'] == 'SPEAKER'}
+        self.assertEqual(speakers, {'SPEAKER 1': (2, True), 'SPEAKER 2': (1, False)})
+
+    def test_unknown_format_or_kind_is_404(self):
+        self.client.force_login(self.vote_session.created_by)
+        self.assertEqual(self.client.get(self.export_url('votes', 'xlsx')).status_code, 404)
+        self.assertEqual(self.client.get(self.export_url('ballots', 'csv')).status_code, 404)
+
+    def test_only_the_owner_may_export(self):
+        other_admin = User.objects.create_user('other-admin')
+        AdminProfile.objects.create(user=other_admin, is_platform_admin=True)
+        for user in (User.objects.get(username='voter0'), other_admin):
+            self.client.force_login(user)
+            self.assertEqual(self.client.get(self.export_url('votes', 'csv')).status_code, 403)
+
+    def test_command_filters_by_code_and_date(self):
+        old = make_session(owner=self.vote_session.created_by)
+        VoteSession.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=10))
+        storage.cast(User.objects.get(username='voter0'), old, ballot(old, 1))
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+
+        out = io.StringIO()
+        call_command('export_votes', format='ndjson', since=since, stdout=out)
+        self.assertEqual({json.loads(line)['session'] for line in out.getvalue().splitlines()}, {self.vote_session.code})
+
+        out = io.StringIO()
+        call_command('export_votes', old.code, kind='results', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 1 + 3)
+
+    def test_command_rejects_bad_input(self):
+        with self.assertRaisesMessage(CommandError, '--since must be a date'):
+            call_command('export_votes', since='2024-13-01', stdout=io.StringIO())
+        with self.assertRaisesMessage(CommandError, 'Unknown session code(s): nope'):
+            call_command('export_votes', 'nope', stdout=io.StringIO())
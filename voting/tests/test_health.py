@@ -0,0 +1,40 @@
+from unittest import mock
+
+from django.db import connection
+from django.db.utils import OperationalError
+from django.urls import reverse
+
+from .. import warmup
+from .base import VotingTestCase
+
+
+class HealthCheckTests(VotingTestCase):
+    def test_liveness_does_not_touch_the_database(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('healthz'))
+        self.assertEqual((response.status_code, response.content), (200, b'ok'))
+
+    def test_ready_when_the_database_and_cache_answer(self):
+        response = self.client.get(reverse('readyz'))
+        self.assertEqual((response.status_code, response.content), (200, b'ok'))
+
+    def test_not_ready_without_the_database(self):
+        with mock.patch.object(connection, 'cursor', side_effect=OperationalError('unable to open database file')):
+            response = self.client.get(reverse('readyz'))
+        self.assertEqual((response.status_code, response.content), (503, b'database unavailable'))
+
+    def test_not_ready_without_the_cache(self):
+        with mock.patch('voting.views.cache.get', side_effect=OSError('disk I/O error')):
+            response = self.client.get(reverse('readyz'))
+        self.assertEqual((response.status_code, response.content), (503, b'cache unavailable'))
+
+
+class WarmupTests(VotingTestCase):
+    def test_every_step_is_timed(self):
+        self.assertEqual(
+            set(warmup.warm_up()), {'warm_urls', 'warm_templates', 'warm_database', 'warm_scan_guard'},
+        )
+
+    def test_database_outage_does_not_stop_the_worker(self):
+        with mock.patch.object(connection, 'ensure_connection', side_effect=OperationalError('unable to open database file')):
+            self.assertFalse(warmup.warm_database())
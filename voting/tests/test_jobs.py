@@ -0,0 +1,51 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.utils import timezone
+
+from .. import jobs
+from ..models import Job
+from .base import VotingTestCase
+
+
+class JobQueueTests(VotingTestCase):
+    def test_due_jobs_are_claimed_once(self):
+        first = Job.objects.enqueue('warm_results', {'session_id': 1}, dedupe_key='warm_results:1')
+        self.assertEqual(Job.objects.enqueue('warm_results', {'session_id': 1}, dedupe_key='warm_results:1'), first)
+        second = Job.objects.enqueue('prune_generated_questions')
+        Job.objects.enqueue('prune_generated_questions', run_at=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(Job.objects.claim('worker-1', limit=5), [first, second])
+        self.assertEqual(Job.objects.claim('worker-2', limit=5), [])
+        self.assertEqual(
+            set(Job.objects.filter(status=Job.RUNNING).values_list('locked_by', flat=True)), {'worker-1'},
+        )
+
+    def test_failures_are_retried_until_max_attempts(self):
+        calls = []
+
+        def flaky(**payload):
+            calls.append(payload)
+            raise RuntimeError('flaky')
+
+        Job.objects.enqueue('test_flaky', {'n': 1}, max_attempts=2)
+        with mock.patch.dict(jobs.registry, test_flaky=flaky):
+            job_obj, = Job.objects.claim('worker')
+            self.assertFalse(jobs.run(job_obj))
+            self.assertEqual((job_obj.status, job_obj.attempts), (Job.QUEUED, 1))
+            self.assertGreater(job_obj.run_at, timezone.now())
+
+            Job.objects.filter(pk=job_obj.pk).update(run_at=timezone.now())
+            job_obj, = Job.objects.claim('worker')
+            self.assertFalse(jobs.run(job_obj))
+        job_obj.refresh_from_db()
+        self.assertEqual((job_obj.status, job_obj.attempts, len(calls)), (Job.FAILED, 2, 2))
+        self.assertIn('RuntimeError: flaky', job_obj.last_error)
+        self.assertIsNotNone(job_obj.finished_at)
+
+    def test_stale_running_jobs_are_requeued(self):
+        Job.objects.enqueue('warm_results')
+        job_obj, = Job.objects.claim('worker')
+        Job.objects.filter(pk=job_obj.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(Job.objects.requeue_stale(timedelta(minutes=10)), 1)
+        self.assertEqual(Job.objects.get(pk=job_obj.pk).status, Job.QUEUED)
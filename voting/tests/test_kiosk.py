@@ -0,0 +1,18 @@
+from .. import kiosk, storage
+from ..models import Role
+from .base import VotingTestCase, ballot, make_session
+
+
+class KioskTests(VotingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.vote_session = make_session()
+        self.roles = [role.pk for role in ballot(self.vote_session, 1)]
+
+    def test_retried_uploads_are_counted_once(self):
+        batch = [{'key': 'ballot-0001', 'roles': self.roles}, {'key': 'ballot-0002', 'roles': self.roles}]
+        self.assertEqual(kiosk.ingest(self.vote_session, batch)['accepted'], ['ballot-0001', 'ballot-0002'])
+        result = kiosk.ingest(self.vote_session, batch + [{'key': 'ballot-0003', 'roles': [0]}])
+        self.assertEqual((result['accepted'], sorted(result['duplicate'])), ([], ['ballot-0001', 'ballot-0002']))
+        self.assertIn('ballot-0003', result['rejected'])
+        self.assertEqual(sum(storage.role_counts(self.vote_session).values()), 2 * len(Role.ROLE_TYPES))
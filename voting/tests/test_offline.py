@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import Client
+from django.urls import reverse
+
+from .. import storage
+from ..offline import SCOPE_HEADER
+from .base import VotingTestCase, ballot, make_session
+
+
+class ServiceWorkerScopeTests(VotingTestCase):
+    def test_pages_with_csrf_tokens_are_not_marked(self):
+        self.assertEqual(self.client.get(reverse('home'))[SCOPE_HEADER], 'anon')
+        self.assertNotIn(SCOPE_HEADER, self.client.get(reverse('tabletopics')))
+        self.assertNotIn(SCOPE_HEADER, self.client.get(reverse('login')))
+
+    def test_each_login_gets_its_own_scope(self):
+        User.objects.create_user('member', password='a-long-passphrase-9')
+        scopes = []
+        for _ in range(2):
+            self.client.post(reverse('login'), {'username': 'member', 'password': 'a-long-passphrase-9'})
+            scopes.append(self.client.get(reverse('home'))[SCOPE_HEADER])
+            self.client.get(reverse('logout'))
+        self.assertNotIn('anon', scopes)
+        self.assertNotEqual(scopes[0], scopes[1])
+
+
+class OfflinePageTests(VotingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.vote_session = make_session()
+        self.client = Client(enforce_csrf_checks=True)
+
+    def test_vote_and_kiosk_pages_can_be_stored(self):
+        self.client.force_login(self.vote_session.created_by)
+        for name in ('vote', 'kiosk'):
+            response = self.client.get(reverse(name, args=[self.vote_session.code]))
+            self.assertIn(SCOPE_HEADER, response, name)
+            self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies, name)
+
+    def test_vote_form_posts_the_cookie_token(self):
+        self.client.force_login(User.objects.create_user('voter'))
+        url = reverse('vote', args=[self.vote_session.code])
+        self.client.get(url)
+        token = self.client.cookies[settings.CSRF_COOKIE_NAME].value
+        choices = {role.role_type.lower(): role.pk for role in ballot(self.vote_session, 1)}
+        self.assertEqual(self.client.post(url, {**choices, 'csrfmiddlewaretoken': token}).status_code, 302)
+        self.assertTrue(storage.has_voted(User.objects.get(username='voter'), self.vote_session))
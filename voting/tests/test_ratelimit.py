@@ -0,0 +1,33 @@
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .. import ratelimit
+from .base import VotingTestCase
+
+
+class RateLimitTests(VotingTestCase):
+    def test_buckets_refill_over_their_period(self):
+        limits = [('test:client', 2, 60), ('test:global', 3, 60)]
+        self.assertEqual([ratelimit.consume(limits, now=1000) for _ in range(2)], [0, 0])
+        self.assertAlmostEqual(ratelimit.consume(limits, now=1000), 30)
+        # A refused request takes no token from the global bucket
+        self.assertEqual(ratelimit.consume([('test:global', 3, 60)], now=1000), 0)
+        self.assertEqual(ratelimit.consume(limits, now=1030), 0)
+
+    @override_settings(RATE_LIMITS={'test': {'user': (1, 60), 'global': (5, 600)}})
+    def test_prune_deletes_only_refilled_buckets(self):
+        ratelimit.consume([('test:old', 1, 60)], now=1000)
+        ratelimit.consume([('test:recent', 1, 60)], now=1500)
+        self.assertEqual(ratelimit.prune(now=1601), 1)
+        self.assertEqual(ratelimit.consume([('test:old', 1, 60)], now=1601), 0)
+        self.assertGreater(ratelimit.consume([('test:recent', 1, 60)], now=1501), 0)
+
+
+class ClientIpTests(SimpleTestCase):
+    @override_settings(RATELIMIT_IP_HEADER='HTTP_X_FORWARDED_FOR')
+    def test_spoofed_forwarded_for_entries_are_ignored(self):
+        factory = RequestFactory()
+        keys = {
+            ratelimit.client_ip(factory.get('/', HTTP_X_FORWARDED_FOR=header))
+            for header in ('203.0.113.7', '198.51.100.1, 203.0.113.7', '10.0.0.1,10.0.0.2, 203.0.113.7')
+        }
+        self.assertEqual(keys, {'203.0.113.7'})
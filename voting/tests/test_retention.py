@@ -0,0 +1,66 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from .. import kiosk, storage
+from ..models import BallotToken, Job, Role
+from .base import VotingTestCase, ballot, make_session
+
+
+class RetentionTests(VotingTestCase):
+    def test_guests_are_deleted_with_archived_votes(self):
+        old = make_session(expires_at=timezone.now() - timedelta(days=91))
+        current = make_session(owner=old.created_by)
+        for vote_session in (old, current):
+            BallotToken.objects.issue(vote_session, 2)
+            kiosk.ingest(vote_session, [{'key': 'ballot-0001', 'roles': [role.pk for role in ballot(vote_session, 1)]}])
+        member = User.objects.create_user('member')
+        storage.cast(member, old, ballot(old, 2))
+
+        call_command('sweep_retention', pause=0, stdout=StringIO())
+
+        self.assertEqual(
+            set(User.objects.values_list('username', flat=True)),
+            {'owner', 'member', kiosk.guest_username(current, 'ballot-0001')}
+            | {token.user.username for token in current.ballot_tokens.all()},
+        )
+        self.assertFalse(BallotToken.objects.filter(vote_session=old).exists())
+        self.assertEqual(
+            sorted(old.roles.filter(archived_votes__gt=0).values_list('archived_votes', flat=True)),
+            [1] * (2 * len(Role.ROLE_TYPES)),
+        )
+
+    def test_archived_sessions_stay_in_voters_history(self):
+        old = make_session(expires_at=timezone.now() - timedelta(days=91))
+        other = make_session(owner=old.created_by)
+        member = User.objects.create_user('member')
+        with override_settings(VOTE_STORAGE='rows'):
+            storage.cast(member, old, ballot(old, 1))
+        with override_settings(VOTE_STORAGE='ballots'):
+            storage.cast(User.objects.create_user('packed'), old, ballot(old, 2))
+
+        # Chunks smaller than one voter's rows
+        call_command('sweep_retention', pause=0, chunk_size=2, stdout=StringIO())
+
+        self.assertFalse(old.votes.exists() or old.ballots.exists())
+        for username in ('member', 'packed'):
+            voter = User.objects.get(username=username)
+            self.assertEqual(list(storage.sessions_voted_in(voter)), [old])
+            self.assertTrue(storage.has_voted(voter, old))
+            self.assertFalse(storage.has_voted(voter, other))
+
+    @override_settings(JOB_RETENTION_DAYS=14)
+    def test_finished_jobs_are_purged_after_the_retention_window(self):
+        now = timezone.now()
+        for i, (status, age) in enumerate([
+            (Job.DONE, 15), (Job.FAILED, 15), (Job.DONE, 13), (Job.QUEUED, 30), (Job.RUNNING, 30),
+        ]):
+            Job.objects.create(name=f'job-{i}', status=status, finished_at=now - timedelta(days=age))
+
+        call_command('sweep_retention', pause=0, stdout=StringIO())
+
+        self.assertEqual(sorted(Job.objects.values_list('name', flat=True)), ['job-2', 'job-3', 'job-4'])
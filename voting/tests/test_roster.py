@@ -0,0 +1,81 @@
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..forms import RosterImportForm
+from ..models import Role, VoteSession
+from .base import VotingTestCase, make_session
+
+
+def import_roster(text):
+    form = RosterImportForm({'roster': text})
+    form.is_valid()
+    return form
+
+
+class RosterImportFormTests(SimpleTestCase):
+    def test_aliases_header_and_quoted_names(self):
+        form = import_roster(
+            'category,name\n'
+            'Speaker, Jane Doe\n'
+            'prepared-speaker,Sam Lee\n'
+            '# comments and blank lines are skipped\n'
+            '\n'
+            'EVALUATORS, John Smith\n'
+            'Table Topics, "Lee, Jr"\n'
+        )
+        self.assertEqual(form.cleaned_data['participants'], [
+            ('SPEAKER', 'Jane Doe'),
+            ('SPEAKER', 'Sam Lee'),
+            ('EVALUATOR', 'John Smith'),
+            ('TABLE_TOPICS', 'Lee, Jr'),
+        ])
+
+    def test_errors_name_each_line(self):
+        form = import_roster(
+            'Speaker, Jane Doe\n'
+            'Judge, Ana Lopez\n'
+            'Evaluator\n'
+            'Table Topics, Lee, Jr\n'
+            f'Speaker, {"x" * 101}\n'
+        )
+        self.assertEqual(form.errors['__all__'], [
+            'Pasted roster, line 2: unknown category "Judge".',
+            'Pasted roster, line 3: expected "category, name" (quote names that contain commas).',
+            'Pasted roster, line 4: expected "category, name" (quote names that contain commas).',
+            'Pasted roster, line 5: names are limited to 100 characters.',
+        ])
+
+    def test_header_only_counts_on_the_first_line(self):
+        form = import_roster('Speaker, Jane Doe\ncategory, name\n')
+        self.assertEqual(form.errors['__all__'], ['Pasted roster, line 2: unknown category "category".'])
+
+
+class CreateSessionRosterTests(VotingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(make_session().created_by)
+
+    def test_large_roster_in_a_constant_number_of_queries(self):
+        fields = [field for field in Role._meta.concrete_fields if not field.primary_key]
+        other_queries = []
+        for size in (30, 500):
+            roster = '\n'.join(f'{("Speaker", "Evaluator", "Table Topics")[i % 3]}, Member {i}' for i in range(size))
+            upload = SimpleUploadedFile('roster.csv', roster.encode())
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.post(reverse('create_session'), {'title': f'Roster {size}', 'roster_file': upload})
+            self.assertEqual(response.status_code, 302)
+
+            # Roles go in one INSERT per batch (SQLite caps the parameters per statement)
+            inserts = sum(query['sql'].startswith('INSERT INTO "voting_role"') for query in captured)
+            batch = min(500, connection.ops.bulk_batch_size(fields, [None] * size))
+            self.assertEqual(inserts, -(-size // batch))
+            other_queries.append(len(captured) - inserts)
+
+            vote_session = VoteSession.objects.get(title=f'Roster {size}')
+            self.assertEqual(vote_session.roles.count(), size)
+            topics = vote_session.roles.filter(role_type='TABLE_TOPICS').order_by('position')
+            self.assertEqual(list(topics.values_list('name', flat=True)[:2]), ['Member 2', 'Member 5'])
+        self.assertEqual(other_queries[0], other_queries[1])
@@ -0,0 +1,61 @@
+from unittest import mock
+
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from ..models import VoteSession
+from ..routers import PIN_COOKIE, ReadReplicaMiddleware, ReadReplicaRouter, replica_reads
+
+
+def read_database(model=VoteSession):
+    return ReadReplicaRouter().db_for_read(model) or 'default'
+
+
+@replica_reads
+def status_view(request):
+    return HttpResponse(read_database())
+
+
+@replica_reads
+def streaming_view(request):
+    return StreamingHttpResponse(read_database() for _ in range(2))
+
+
+# SimpleTestCase: TestCase wraps each test in a transaction, which keeps
+# every read on the primary
+@override_settings(READ_DATABASE_ALIAS='replica')
+@mock.patch('voting.routers.replica_configured', return_value=True)
+class ReadReplicaTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_status_reads_go_to_the_replica(self, configured):
+        self.assertEqual(status_view(self.factory.get('/')).content, b'replica')
+        self.assertEqual(b''.join(streaming_view(self.factory.get('/')).streaming_content), b'replicareplica')
+        # Outside decorated views, and for login sessions, reads stay on the primary
+        self.assertEqual(read_database(), 'default')
+
+    def test_pinned_clients_read_from_the_primary(self, configured):
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.assertEqual(status_view(request).content, b'default')
+
+    def test_login_sessions_stay_on_the_primary(self, configured):
+        @replica_reads
+        def view(request):
+            return HttpResponse(read_database(Session))
+
+        self.assertEqual(view(self.factory.get('/')).content, b'default')
+
+    @override_settings(READ_REPLICA_PIN_SECONDS=5)
+    def test_writes_pin_the_client(self, configured):
+        middleware = ReadReplicaMiddleware(lambda request: HttpResponse())
+        response = middleware(self.factory.post('/'))
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+        self.assertNotIn(PIN_COOKIE, middleware(self.factory.get('/')).cookies)
+
+    def test_without_a_replica_nothing_changes(self, configured):
+        configured.return_value = False
+        self.assertEqual(status_view(self.factory.get('/')).content, b'default')
+        self.assertNotIn(PIN_COOKIE, ReadReplicaMiddleware(lambda request: HttpResponse())(self.factory.post('/')).cookies)
@@ -0,0 +1,58 @@
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+
+from .. import scanguard
+from ..models import VoteSession
+from .base import VotingTestCase, make_session
+
+
+@override_settings(SCAN_GUARD_ENABLED=True, SCAN_GUARD_MISSES=(2, 600))
+class ScanGuardTests(VotingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.vote_session = make_session()
+        # A fresh filter loads the codes this test's (uncommitted) transaction sees
+        patcher = mock.patch.object(scanguard, 'codes', scanguard.CodeFilter())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_unknown_codes_get_404_then_429(self):
+        url = reverse('api_session', args=['zzzzzzzz'])
+        self.assertEqual([self.client.get(url).status_code for _ in range(3)], [404, 404, 429])
+        self.assertIn('Retry-After', self.client.get(url))
+        # Known codes are never blocked
+        self.assertEqual(self.client.get(reverse('api_session', args=[self.vote_session.code])).status_code, 200)
+
+
+class CodeFilterTests(VotingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = make_session().created_by
+        self.codes = scanguard.CodeFilter()
+
+    def create(self, pk, code):
+        return VoteSession.objects.create(pk=pk, code=code, title='Test', created_by=self.owner)
+
+    def test_sessions_committed_out_of_id_order_are_found(self):
+        first = VoteSession.objects.get()
+        # pk + 2 commits before pk + 1
+        self.create(first.pk + 2, 'cccc')
+        self.assertTrue(self.codes.might_exist('cccc'))
+        self.create(first.pk + 1, 'bbbb')
+        scanguard.publish_new_codes()
+        self.assertTrue(self.codes.might_exist('bbbb'))
+
+    @mock.patch.object(scanguard, 'GAP_WINDOW', 0)
+    def test_periodic_reload_rebuilds_the_filter(self):
+        first = VoteSession.objects.get()
+        self.create(first.pk + 10, 'cccc')
+        self.codes.refresh()
+        bloom = self.codes.bloom
+        # Not published, and too far below the newest id to be looked up again
+        self.create(first.pk + 1, 'dddd')
+        self.assertFalse(self.codes.might_exist('dddd'))
+        with override_settings(SCAN_GUARD_RELOAD_SECONDS=0):
+            self.assertTrue(self.codes.might_exist('dddd'))
+        self.assertIsNot(self.codes.bloom, bloom)
@@ -0,0 +1,34 @@
+from unittest import mock
+
+from ..models import (
+    CODE_ALPHABET, CODE_ATTEMPTS_PER_LENGTH, CODE_MAX_LOAD, MAX_CODE_LENGTH, MIN_CODE_LENGTH, code_length_for,
+)
+from .base import VotingTestCase, make_session
+
+
+class SessionCodeTests(VotingTestCase):
+    def test_length_grows_with_the_session_count(self):
+        self.assertEqual(code_length_for(0), MIN_CODE_LENGTH)
+        full = int(len(CODE_ALPHABET) ** MIN_CODE_LENGTH * CODE_MAX_LOAD)
+        self.assertEqual(code_length_for(full - 1), MIN_CODE_LENGTH)
+        self.assertEqual(code_length_for(full), MIN_CODE_LENGTH + 1)
+        self.assertEqual(code_length_for(10 ** 30), MAX_CODE_LENGTH)
+
+    def test_collisions_move_to_a_longer_code(self):
+        taken = make_session(code='aaaa')
+        picks = []
+
+        def pick(length):
+            picks.append(length)
+            return 'a' * length
+
+        with mock.patch('voting.models.generate_random_code', side_effect=pick):
+            vote_session = make_session(owner=taken.created_by)
+        self.assertEqual(vote_session.code, 'aaaaa')
+        self.assertEqual(picks, [MIN_CODE_LENGTH] * CODE_ATTEMPTS_PER_LENGTH + [MIN_CODE_LENGTH + 1])
+
+    def test_codes_are_unique(self):
+        owner = make_session().created_by
+        codes = {make_session(owner=owner, positions=0).code for _ in range(50)}
+        self.assertEqual(len(codes), 50)
+        self.assertTrue(all(len(code) == MIN_CODE_LENGTH for code in codes))
@@ -0,0 +1,75 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import similarity
+from ..models import GeneratedQuestion
+from .base import VotingTestCase
+
+ADVICE = 'What is the best piece of advice you have ever received, and did you follow it?'
+ADVICE_REWORDED = 'What is the best advice you have ever received and did you follow it?'
+DINNER = 'If you could have dinner with any historical figure, who would it be and why?'
+
+
+class SimilarityTests(SimpleTestCase):
+    def test_rewording_scores_above_the_threshold(self):
+        advice = similarity.minhash(ADVICE)
+        self.assertGreaterEqual(similarity.similarity(advice, similarity.minhash(ADVICE_REWORDED)), 0.6)
+        self.assertLess(similarity.similarity(advice, similarity.minhash(DINNER)), 0.2)
+
+    def test_case_and_punctuation_are_ignored(self):
+        self.assertEqual(similarity.minhash(ADVICE), similarity.minhash(ADVICE.upper().replace(',', ' ;')))
+
+    def test_signatures_survive_storage(self):
+        signature = similarity.minhash(ADVICE)
+        self.assertEqual(similarity.unpack(similarity.pack(signature)), signature)
+
+
+class NearDuplicateTests(VotingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = GeneratedQuestion.objects.record('Advice', ADVICE, similarity.minhash(ADVICE))
+
+    def find(self, text, since=None):
+        since = since or timezone.now() - timedelta(days=1)
+        return GeneratedQuestion.objects.find_near_duplicate(similarity.minhash(text), since, 0.6)
+
+    def test_rewording_is_found(self):
+        self.assertEqual(self.find(ADVICE_REWORDED), self.question)
+
+    def test_unrelated_question_is_not(self):
+        self.assertIsNone(self.find(DINNER))
+
+    def test_only_questions_inside_the_window_count(self):
+        GeneratedQuestion.objects.filter(pk=self.question.pk).update(created_at=timezone.now() - timedelta(days=3))
+        self.assertIsNone(self.find(ADVICE_REWORDED, since=timezone.now() - timedelta(days=2)))
+        self.assertEqual(self.find(ADVICE_REWORDED, since=timezone.now() - timedelta(days=4)), self.question)
+
+
+@override_settings(OPENROUTER_API_KEY='')
+class TableTopicsTests(VotingTestCase):
+    def generate(self, body):
+        return self.client.post(reverse('generate_tabletopics'), body, content_type='application/json')
+
+    def test_rejects_bad_topics_before_calling_the_ai(self):
+        self.assertEqual(self.generate({'topic': 'x' * 201}).status_code, 400)
+        self.assertEqual(self.generate({'topic': 42}).status_code, 400)
+        self.assertEqual(self.generate(['Leadership']).status_code, 400)
+        # A valid topic gets as far as the (unconfigured) AI service
+        self.assertEqual(self.generate({'topic': 'x' * 200}).status_code, 500)
+
+    @override_settings(OPENROUTER_API_KEY='test-key', TABLETOPICS_MAX_ATTEMPTS=3)
+    def test_repeated_questions_are_regenerated(self):
+        GeneratedQuestion.objects.record('Advice', ADVICE, similarity.minhash(ADVICE))
+        replies = [ADVICE_REWORDED, DINNER]
+        response = mock.Mock(**{'json.side_effect': lambda: {'choices': [{'message': {'content': replies.pop(0)}}]}})
+        with mock.patch('requests.post', return_value=response) as post:
+            data = self.generate({'topic': 'Advice'}).json()
+
+        self.assertEqual((data['question'], data['repeat']), (DINNER, False))
+        second_prompt = post.call_args_list[1].kwargs['json']['messages'][0]['content']
+        self.assertIn(f'Do NOT repeat or paraphrase any of these questions:\n- {ADVICE}', second_prompt)
+        self.assertEqual(GeneratedQuestion.objects.filter(text=DINNER).count(), 1)
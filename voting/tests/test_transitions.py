@@ -0,0 +1,34 @@
+from django.urls import reverse
+
+from ..models import Job, VoteSession
+from .base import VotingTestCase, make_session
+
+
+class TransitionTests(VotingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.vote_session = make_session()
+
+    def test_conditional_change_bumps_the_version_once(self):
+        def close():
+            return VoteSession.objects.transition(self.vote_session.pk, expected={'polls_closed': False}, polls_closed=True)
+
+        self.assertEqual(close(), {'state_version': 1, 'polls_closed': True})
+        self.assertIsNone(close())
+        self.assertEqual(VoteSession.objects.get(pk=self.vote_session.pk).state_version, 1)
+
+    def test_closing_twice_conflicts(self):
+        self.client.force_login(self.vote_session.created_by)
+        url = reverse('close_polls', args=[self.vote_session.code])
+        response = self.client.post(url)
+        self.assertEqual((response.status_code, response.json()['version']), (200, 1))
+        self.assertEqual(self.client.post(url).status_code, 409)
+        self.assertEqual(Job.objects.filter(name='warm_results').count(), 1)
+
+    def test_each_toggle_flips_from_the_stored_value(self):
+        self.client.force_login(self.vote_session.created_by)
+        url = reverse('toggle_results', args=[self.vote_session.code])
+        versions = [self.client.post(url).json() for _ in range(2)]
+        self.assertEqual(
+            [(state['show_results'], state['version']) for state in versions], [(True, 1), (False, 2)],
+        )
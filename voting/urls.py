@@ -1,6 +1,6 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.home, name='home'),
@@ -10,11 +10,23 @@ urlpatterns = [
     path('dashboard/', views.dashboard, name='dashboard'),
     path('create-session/', views.create_vote_session, name='create_session'),
     path('vote/<str:code>/', views.vote_view, name='vote'),
+    path('vote/<str:code>/kiosk/', views.kiosk_view, name='kiosk'),
+    path('vote/<str:code>/kiosk/ballots/', views.kiosk_upload, name='kiosk_upload'),
+    path('vote/<str:code>/t/', views.token_entry, name='token_entry'),
+    path('vote/<str:code>/t/<str:token>/', views.token_vote_view, name='token_vote'),
     path('results/<str:code>/', views.results_view, name='results'),
     path('manage/<str:code>/', views.manage_session, name='manage_session'),
+    path('manage/<str:code>/tokens/', views.issue_tokens, name='issue_tokens'),
     path('close-polls/<str:code>/', views.close_polls, name='close_polls'),
+    path('export/<str:code>/<str:kind>.<str:fmt>', views.export_session, name='export_session'),
     path('toggle-results/<str:code>/', views.toggle_results, name='toggle_results'),
+    path('healthz', views.healthz, name='healthz'),
+    path('readyz', views.readyz, name='readyz'),
+    path('sw.js', views.service_worker, name='service_worker'),
     path('timer/', views.timer_view, name='timer'),
     path('table-topics/', views.tabletopics_view, name='tabletopics'),
+    path('api/v1/sessions/<str:code>/', api.session_detail, name='api_session'),
+    path('api/v1/sessions/<str:code>/results/', api.session_results, name='api_session_results'),
+    path('api/v1/sessions/<str:code>/ballot/', api.submit_ballot, name='api_submit_ballot'),
     path('api/generate-question/', views.generate_tabletopics, name='generate_tabletopics'),
 ]
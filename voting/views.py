@@ -3,15 +3,40 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.urls import reverse
 from django.utils import timezone
-from django.http import HttpResponseForbidden, HttpResponse, JsonResponse
-from django.db.models import Count
-from django.db import transaction
+from django.http import Http404, HttpResponseForbidden, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.db.utils import DatabaseError
+from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.decorators.http import require_POST
 from django.conf import settings
-from .models import VoteSession, Role, Vote, AdminProfile
-from .forms import UserRegistrationForm, VoteSessionForm, VoteForm
+from django.core.cache import cache
+from django.templatetags.static import static
+from django.utils.functional import SimpleLazyObject
+from .models import VoteSession, Role, AdminProfile, BallotToken, GeneratedQuestion, Job
+from .forms import UserRegistrationForm, VoteSessionForm, VoteForm, RosterImportForm
+from .cache import session_tag, set_tagged
+from .ratelimit import rate_limit
+from .routers import reading_from_replica, replica_reads
+from . import exports, kiosk, similarity, storage
+import hashlib
 import json
-import requests as http_requests
+
+# Static files the service worker stores on install so the timer works offline
+SERVICE_WORKER_PRECACHE = [
+    'voting/dist/app.min.css',
+    'voting/dist/app.min.js',
+    'voting/css/timer.css',
+    'voting/js/timer.js',
+    'voting/css/tabletopics.css',
+    'voting/js/tabletopics.js',
+    'voting/js/kiosk.js',
+    'voting/images/favicon/favicon.ico',
+    'voting/images/favicon/favicon-32.png',
+    'voting/images/responsive/toastyvotes-logo-30.webp',
+    'voting/images/responsive/toastyvotes-logo-60.webp',
+    'voting/images/responsive/toastyvotes-logo-90.webp',
+]
 
 
 def home(request):
@@ -33,6 +58,7 @@ def register(request):
 
 
 @login_required
+@replica_reads
 def dashboard(request):
     """Dashboard view for users"""
     # Check if the user is a platform admin
@@ -51,16 +77,12 @@ def dashboard(request):
         vote_sessions = VoteSession.objects.filter(created_by=request.user)
     else:
         # For regular users, show their votes
-        user_votes = Vote.objects.filter(user=request.user)
-        vote_sessions = VoteSession.objects.filter(votes__in=user_votes).distinct()
+        vote_sessions = storage.sessions_voted_in(request.user)
     
     # Check if user has already voted in the active session
     has_voted_in_active = False
     if latest_active_session:
-        has_voted_in_active = Vote.objects.filter(
-            user=request.user, 
-            vote_session=latest_active_session
-        ).exists()
+        has_voted_in_active = storage.has_voted(request.user, latest_active_session)
     
     context = {
         'vote_sessions': vote_sessions,
@@ -88,18 +110,20 @@ def create_vote_session(request):
     
     if request.method == 'POST':
         session_form = VoteSessionForm(request.POST)
+        roster_form = RosterImportForm(request.POST, request.FILES)
         
-        if session_form.is_valid():
-            # Collect participant names from POST data
-            role_data = []  # list of (role_type, position, name)
+        if session_form.is_valid() and roster_form.is_valid():
+            # Typed names first, then the imported roster; positions run on
+            # per category in that order
+            participants = []
             for cat in categories:
-                names = request.POST.getlist(f"participant_{cat['key']}")
-                for pos, name in enumerate(names, start=1):
+                for name in request.POST.getlist(f"participant_{cat['key']}"):
                     name = name.strip()
                     if name:
-                        role_data.append((cat['key'], pos, name))
+                        participants.append((cat['key'], name))
+            participants.extend(roster_form.cleaned_data['participants'])
             
-            if not role_data:
+            if not participants:
                 messages.error(request, 'Please add at least one participant.')
             else:
                 with transaction.atomic():
@@ -108,26 +132,33 @@ def create_vote_session(request):
                     vote_session.expires_at = timezone.now() + timezone.timedelta(hours=24)
                     vote_session.save()
                     
-                    for role_type, position, name in role_data:
-                        Role.objects.create(
+                    positions = {}
+                    roles = []
+                    for role_type, name in participants:
+                        positions[role_type] = positions.get(role_type, 0) + 1
+                        roles.append(Role(
                             vote_session=vote_session,
                             role_type=role_type,
-                            position=position,
+                            position=positions[role_type],
                             name=name,
-                        )
+                        ))
+                    Role.objects.bulk_create(roles, batch_size=500)
                 
                 messages.success(request, f'Vote session created! Share this link: {request.build_absolute_uri(reverse("vote", kwargs={"code": vote_session.code}))}') 
                 return redirect('dashboard')
     else:
         session_form = VoteSessionForm()
+        roster_form = RosterImportForm()
     
     context = {
         'session_form': session_form,
+        'roster_form': roster_form,
         'categories': categories,
     }
     return render(request, 'voting/create_session.html', context)
 
 
+@ensure_csrf_cookie
 def vote_view(request, code):
     """View for casting votes or viewing results"""
     vote_session = get_object_or_404(VoteSession, code=code)
@@ -143,28 +174,23 @@ def vote_view(request, code):
     
     # Handle user authentication
     if not request.user.is_authenticated:
+        if vote_session.ballot_tokens.exists():
+            return render(request, 'voting/ballot_code.html', {'vote_session': vote_session})
         messages.info(request, 'Please log in to vote.')
         return redirect(f"{reverse('login')}?next={reverse('vote', kwargs={'code': code})}")
     
     # Check if user has already voted in this session
-    user_votes = Vote.objects.filter(user=request.user, vote_session=vote_session)
-    has_voted = user_votes.exists()
+    has_voted = storage.has_voted(request.user, vote_session)
     
     if request.method == 'POST' and not has_voted:
         form = VoteForm(vote_session, request.POST)
         if form.is_valid():
-            with transaction.atomic():
-                # Create votes for each active category
-                for cat in form.active_categories:
-                    role = form.cleaned_data[cat['field_name']]
-                    vote = Vote(
-                        user=request.user,
-                        role=role,
-                        vote_session=vote_session
-                    )
-                    vote.save()
-            
-            messages.success(request, 'Your votes have been recorded!')
+            # One choice for each active category, stored per settings.VOTE_STORAGE
+            roles = [form.cleaned_data[cat['field_name']] for cat in form.active_categories]
+            if storage.cast_once(request.user, vote_session, roles):
+                messages.success(request, 'Your votes have been recorded!')
+            else:
+                messages.info(request, 'You have already voted in this session.')
             return redirect('dashboard')
     else:
         form = VoteForm(vote_session)
@@ -177,36 +203,150 @@ def vote_view(request, code):
     return render(request, 'voting/vote.html', context)
 
 
+@rate_limit('ballot_token')
+def token_entry(request, code):
+    """View that turns a typed ballot code into its voting link"""
+    vote_session = get_object_or_404(VoteSession, code=code)
+    token = BallotToken.normalize(request.GET.get('token', ''))
+    if not token:
+        return redirect('vote', code=vote_session.code)
+    return redirect('token_vote', code=vote_session.code, token=token)
+
+
+@rate_limit('ballot_token')
+def token_vote_view(request, code, token):
+    """View for casting one ballot with a single-use token, without logging in"""
+    vote_session = get_object_or_404(VoteSession, code=code)
+    if vote_session.is_expired():
+        messages.warning(request, 'This voting session has expired.')
+        return redirect('home')
+    if vote_session.polls_closed:
+        return redirect('results', code=code)
+
+    ballot_token = BallotToken.objects.lookup(vote_session, token)
+    if ballot_token is None:
+        context = {'vote_session': vote_session, 'invalid_token': True}
+        return render(request, 'voting/ballot_code.html', context, status=404)
+
+    # No login and no session row: the token is the voter's identity
+    has_voted = ballot_token.used_at is not None
+    if request.method == 'POST' and not has_voted:
+        form = VoteForm(vote_session, request.POST)
+        if form.is_valid():
+            roles = [form.cleaned_data[cat['field_name']] for cat in form.active_categories]
+            with transaction.atomic():
+                if ballot_token.mark_used():
+                    storage.cast(ballot_token.user, vote_session, roles)
+            has_voted = True
+    else:
+        form = VoteForm(vote_session)
+
+    context = {
+        'vote_session': vote_session,
+        'form': form,
+        'has_voted': has_voted,
+    }
+    return render(request, 'voting/vote.html', context)
+
+
 @login_required
-def results_view(request, code):
-    """View for showing voting results"""
+@ensure_csrf_cookie
+def kiosk_view(request, code):
+    """View for collecting ballots on one shared device, queued offline and uploaded in batches (admin only)"""
     vote_session = get_object_or_404(VoteSession, code=code)
     
-    # Check if user is admin or polls are closed
     is_admin = hasattr(request.user, 'admin_profile') and request.user.admin_profile.is_platform_admin
-    if not vote_session.polls_closed and not is_admin:
-        messages.warning(request, 'Polls are still open. Results are not available yet.')
-        return redirect('vote', code=code)
+    if not is_admin or vote_session.created_by != request.user:
+        return HttpResponseForbidden("You don't have permission to run a kiosk for this session.")
+    
+    context = {
+        'vote_session': vote_session,
+        'form': VoteForm(vote_session),
+        'max_batch': settings.KIOSK_MAX_BATCH,
+    }
+    return render(request, 'voting/kiosk.html', context)
+
+
+@login_required
+@require_POST
+def kiosk_upload(request, code):
+    """AJAX view storing a batch of kiosk ballots in one transaction"""
+    vote_session = get_object_or_404(VoteSession, code=code)
+    
+    is_admin = hasattr(request.user, 'admin_profile') and request.user.admin_profile.is_platform_admin
+    if not is_admin or vote_session.created_by != request.user:
+        return HttpResponseForbidden()
+    # The device keeps its queue until the ballots are accepted
+    if vote_session.polls_closed or vote_session.is_expired():
+        return JsonResponse({'error': 'Voting has ended for this session.'}, status=409)
+    
+    try:
+        ballots = json.loads(request.body)['ballots']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Expected {"ballots": [...]}.'}, status=400)
+    if not isinstance(ballots, list) or len(ballots) > settings.KIOSK_MAX_BATCH:
+        return JsonResponse({'error': f'Send at most {settings.KIOSK_MAX_BATCH} ballots per request.'}, status=400)
+    
+    return JsonResponse(kiosk.ingest(vote_session, ballots))
+
+
+def tally_results(vote_session):
+    """Count the votes per role type, skipping categories without participants"""
+    # Archived votes were folded into Role.archived_votes by sweep_retention
+    roles = list(vote_session.roles.all())
+    live = storage.role_counts(vote_session, roles)
+    totals = {role.pk: live[role.pk] + role.archived_votes for role in roles}
+    by_type = {}
+    for role in sorted(roles, key=lambda role: -totals[role.pk]):
+        votes = by_type.setdefault(role.role_type, [])
+        if totals[role.pk]:
+            votes.append({'role__name': role.name, 'count': totals[role.pk]})
     
-    # Get votes for each role type — only include categories that have participants
     results = {}
     for role_type, role_name in Role.ROLE_TYPES:
-        roles = Role.objects.filter(vote_session=vote_session, role_type=role_type)
-        if not roles.exists():
+        if role_type not in by_type:
             continue
-        votes = Vote.objects.filter(role__in=roles).values('role__name').annotate(count=Count('id')).order_by('-count')
+        votes = by_type[role_type]
         
         # Find winners (could be multiple in case of a tie)
-        winners = []
-        if votes:
-            max_votes = votes[0]['count']
-            winners = [v['role__name'] for v in votes if v['count'] == max_votes]
+        winning_votes = [v for v in votes if v['count'] == votes[0]['count']] if votes else []
         
         results[role_type] = {
-            'votes': list(votes),
-            'winners': winners,
+            'votes': votes,
+            'winners': [v['role__name'] for v in winning_votes],
+            'winning_votes': winning_votes,
             'type_display': role_name
         }
+    return results
+
+
+def cached_tally(vote_session):
+    """Tally from the shared cache; voting/signals.py evicts it when votes or roles change"""
+    key = f'tally:{vote_session.pk}'
+    results = cache.get(key)
+    if results is None:
+        results = tally_results(vote_session)
+        # A replica may not have the latest votes yet: keep its tally only as long as it may lag
+        timeout = settings.READ_REPLICA_PIN_SECONDS if reading_from_replica() else settings.TALLY_CACHE_SECONDS
+        set_tagged(key, results, timeout, tags=[session_tag(vote_session.pk)])
+    return results
+
+
+@login_required
+@replica_reads
+def results_view(request, code):
+    """View for showing voting results"""
+    vote_session = get_object_or_404(VoteSession, code=code)
+    
+    # Check if user is admin or polls are closed
+    is_admin = hasattr(request.user, 'admin_profile') and request.user.admin_profile.is_platform_admin
+    if not vote_session.polls_closed and not is_admin:
+        messages.warning(request, 'Polls are still open. Results are not available yet.')
+        return redirect('vote', code=code)
+    
+    # Tallied only if the template renders it: closed-session results come
+    # from the fragment cache
+    results = SimpleLazyObject(lambda: cached_tally(vote_session))
     
     context = {
         'vote_session': vote_session,
@@ -227,11 +367,44 @@ def manage_session(request, code):
         return HttpResponseForbidden("You don't have permission to manage this session.")
     
     context = {
-        'vote_session': vote_session
+        'vote_session': vote_session,
+        'tokens': vote_session.ballot_tokens.aggregate(issued=Count('pk'), used=Count('used_at')),
     }
     return render(request, 'voting/manage_session.html', context)
 
 
+@login_required
+@require_POST
+def issue_tokens(request, code):
+    """View for issuing a batch of ballot tokens and showing them for printing (admin only)"""
+    vote_session = get_object_or_404(VoteSession, code=code)
+    
+    is_admin = hasattr(request.user, 'admin_profile') and request.user.admin_profile.is_platform_admin
+    if not is_admin or vote_session.created_by != request.user:
+        return HttpResponseForbidden("You don't have permission to manage this session.")
+    
+    try:
+        count = int(request.POST.get('count', ''))
+    except ValueError:
+        count = 0
+    if not 1 <= count <= settings.BALLOT_TOKENS_PER_BATCH:
+        messages.error(request, f'Issue between 1 and {settings.BALLOT_TOKENS_PER_BATCH} ballot codes at a time.')
+        return redirect('manage_session', code=code)
+    
+    issued = [
+        {
+            'label': token.label,
+            'code': BallotToken.display(plaintext),
+            'url': request.build_absolute_uri(reverse('token_vote', args=[vote_session.code, plaintext])),
+        }
+        for token, plaintext in BallotToken.objects.issue(vote_session, count)
+    ]
+    # The codes cannot be shown again, so keep this page out of every cache
+    response = render(request, 'voting/ballot_tokens.html', {'vote_session': vote_session, 'issued': issued})
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
 @login_required
 def close_polls(request, code):
     """AJAX view for closing polls"""
@@ -245,11 +418,15 @@ def close_polls(request, code):
     if not is_admin or vote_session.created_by != request.user:
         return HttpResponseForbidden()
     
-    # Close the polls
-    vote_session.polls_closed = True
-    vote_session.save()
+    # Close the polls, unless another request already did
+    state = VoteSession.objects.transition(vote_session.pk, expected={'polls_closed': False}, polls_closed=True)
+    if state is None:
+        return JsonResponse({'success': False, 'polls_closed': True, 'error': 'Polls are already closed.'}, status=409)
     
-    return HttpResponse(json.dumps({'success': True}), content_type='application/json')
+    # Tally in the background so the first results view is a cache hit
+    Job.objects.enqueue('warm_results', {'session_id': vote_session.pk}, dedupe_key=f'warm_results:{vote_session.pk}')
+    
+    return JsonResponse({'success': True, 'polls_closed': True, 'version': state['state_version']})
 
 
 @login_required
@@ -265,11 +442,74 @@ def toggle_results(request, code):
     if not is_admin or vote_session.created_by != request.user:
         return HttpResponseForbidden()
     
-    # Toggle show_results
-    vote_session.show_results = not vote_session.show_results
-    vote_session.save()
+    # Toggle show_results in the UPDATE itself so concurrent toggles both apply
+    state = VoteSession.objects.transition(vote_session.pk, show_results=~F('show_results'))
+    if state is None:
+        return JsonResponse({'success': False, 'error': 'Session not found.'}, status=404)
     
-    return HttpResponse(json.dumps({'show_results': vote_session.show_results}), content_type='application/json')
+    return JsonResponse({'success': True, 'show_results': state['show_results'], 'version': state['state_version']})
+
+
+@login_required
+@replica_reads
+def export_session(request, code, kind, fmt):
+    """View for downloading a session's vote ledger or results as CSV or NDJSON (admin only)"""
+    vote_session = get_object_or_404(VoteSession, code=code)
+    if fmt not in exports.FORMATS or kind not in ('votes', 'results'):
+        raise Http404
+
+    is_admin = hasattr(request.user, 'admin_profile') and request.user.admin_profile.is_platform_admin
+    if not is_admin or vote_session.created_by != request.user:
+        return HttpResponseForbidden("You don't have permission to export this session.")
+
+    if kind == 'votes':
+        lines = exports.encode(exports.ledger_rows([vote_session]), exports.LEDGER_FIELDS, fmt)
+    else:
+        lines = exports.encode(exports.results_rows([vote_session]), exports.RESULTS_FIELDS, fmt)
+    # Rows are read and sent chunk by chunk as the client downloads
+    response = StreamingHttpResponse(lines, content_type=exports.FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{vote_session.code}-{kind}.{fmt}"'
+    return response
+
+
+def service_worker(request):
+    """Service worker script, served from the site root so it can control every page"""
+    precache_urls = [static(name) for name in SERVICE_WORKER_PRECACHE] + [reverse('timer')]
+    context = {
+        'version': hashlib.sha256(json.dumps(precache_urls).encode()).hexdigest()[:12],
+        'precache_urls': json.dumps(precache_urls),
+        'static_url': settings.STATIC_URL,
+        # Table Topics embeds a CSRF token, so it is never stored (voting/offline.py)
+        'stale_while_revalidate': json.dumps([reverse('home'), reverse('timer')]),
+        'logout_url': reverse('logout'),
+        'network_first': json.dumps([
+            reverse(name, kwargs={'code': '-'})[:-2] for name in ('vote', 'results')
+        ]),
+        'network_timeout': settings.SERVICE_WORKER_NETWORK_TIMEOUT_MS,
+    }
+    response = render(request, 'voting/sw.js', context, content_type='application/javascript')
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def healthz(request):
+    """Liveness check: answers without touching the database"""
+    return HttpResponse('ok', content_type='text/plain')
+
+
+def readyz(request):
+    """Readiness check: fails with 503 while the database or the cache is unreachable"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except DatabaseError:
+        return HttpResponse('database unavailable', status=503, content_type='text/plain')
+    try:
+        cache.get('readyz')
+    except Exception:
+        # Each cache backend raises its own errors
+        return HttpResponse('cache unavailable', status=503, content_type='text/plain')
+    return HttpResponse('ok', content_type='text/plain')
 
 
 def timer_view(request):
@@ -283,16 +523,25 @@ def tabletopics_view(request):
 
 
 @require_POST
+@rate_limit('generate_tabletopics')
 def generate_tabletopics(request):
     """API endpoint to generate a Toastmasters Table Topics question via OpenRouter AI"""
+    # Imported here: requests is the slowest import in the app and only this view needs it
+    import requests as http_requests
+
     try:
         body = json.loads(request.body)
     except (json.JSONDecodeError, ValueError):
         return JsonResponse({'error': 'Invalid request body.'}, status=400)
 
-    topic = body.get('topic', '').strip()
+    topic = body.get('topic') if isinstance(body, dict) else None
+    topic = topic.strip() if isinstance(topic, str) else ''
     if not topic:
         return JsonResponse({'error': 'Please provide a topic.'}, status=400)
+    # Checked before the paid AI call: a longer topic could not be stored
+    max_length = GeneratedQuestion._meta.get_field('topic').max_length
+    if len(topic) > max_length:
+        return JsonResponse({'error': f'Topics are limited to {max_length} characters.'}, status=400)
 
     api_key = settings.OPENROUTER_API_KEY
     if not api_key:
@@ -306,28 +555,54 @@ def generate_tabletopics(request):
         "extra commentary—return ONLY the question itself.\n\n"
         f"Topic: {topic}"
     )
+    since = timezone.now() - timezone.timedelta(days=settings.TABLETOPICS_DUPLICATE_WINDOW_DAYS)
+    rejected = []
 
     try:
-        response = http_requests.post(
-            'https://openrouter.ai/api/v1/chat/completions',
-            headers={
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json',
-            },
-            json={
-                'model': 'openai/gpt-5.4-mini',
-                'messages': [
-                    {'role': 'user', 'content': prompt}
-                ],
-                'max_tokens': 150,
-                'temperature': 0.9,
-            },
-            timeout=15,
+        # Regenerate while the AI repeats a question the club has heard recently
+        for attempt in range(settings.TABLETOPICS_MAX_ATTEMPTS):
+            if rejected:
+                avoid = '\n'.join(f'- {q}' for q in rejected)
+                attempt_prompt = f"{prompt}\n\nDo NOT repeat or paraphrase any of these questions:\n{avoid}"
+            else:
+                attempt_prompt = prompt
+
+            response = http_requests.post(
+                'https://openrouter.ai/api/v1/chat/completions',
+                headers={
+                    'Authorization': f'Bearer {api_key}',
+                    'Content-Type': 'application/json',
+                },
+                json={
+                    'model': 'openai/gpt-5.4-mini',
+                    'messages': [
+                        {'role': 'user', 'content': attempt_prompt}
+                    ],
+                    'max_tokens': 150,
+                    'temperature': 0.9,
+                },
+                timeout=15,
+            )
+            response.raise_for_status()
+            data = response.json()
+            question = data['choices'][0]['message']['content'].strip()
+
+            signature = similarity.minhash(question)
+            duplicate = GeneratedQuestion.objects.find_near_duplicate(
+                signature, since, settings.TABLETOPICS_DUPLICATE_THRESHOLD
+            )
+            if duplicate is None:
+                break
+            rejected.append(duplicate.text)
+
+        GeneratedQuestion.objects.record(topic, question, signature)
+        # At most one pending prune, run an hour after the first new question
+        Job.objects.enqueue(
+            'prune_generated_questions',
+            run_at=timezone.now() + timezone.timedelta(hours=1),
+            dedupe_key='prune_generated_questions',
         )
-        response.raise_for_status()
-        data = response.json()
-        question = data['choices'][0]['message']['content'].strip()
-        return JsonResponse({'question': question, 'topic': topic})
+        return JsonResponse({'question': question, 'topic': topic, 'repeat': duplicate is not None})
     except http_requests.exceptions.Timeout:
         return JsonResponse({'error': 'AI service timed out. Please try again.'}, status=504)
     except http_requests.exceptions.RequestException as e:
@@ -0,0 +1,90 @@
+"""
+Warm a freshly started worker before it takes traffic.
+
+Without this, the first requests after a deploy or worker recycle pay for
+compiling the URL patterns, parsing templates and connecting to the database.
+"""
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.utils import DatabaseError
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+from . import scanguard
+from .models import VoteSession
+
+TEMPLATE_DIR = Path(settings.BASE_DIR) / 'templates' / 'voting'
+
+
+def warm_urls():
+    """Compile every URL pattern and build the reverse lookup tables"""
+    resolver = get_resolver()
+    # Populating the reverse tables touches the regex of every pattern,
+    # including those of included URLconfs such as the admin.
+    resolver._populate()
+    return len(resolver.reverse_dict)
+
+
+def warm_templates():
+    """Load every voting template into the cached template loader"""
+    names = sorted(f'voting/{path.name}' for path in TEMPLATE_DIR.iterdir() if path.is_file())
+    for name in names:
+        get_template(name)
+    return len(names)
+
+
+def warm_database():
+    """Connect to each database and run one ORM query, on the calling thread"""
+    # Connections are per thread, so this warms the thread that serves
+    # requests in sync workers; threaded workers use warm_thread_pool. A
+    # database that is down must not stop the worker from booting; /readyz
+    # reports it instead.
+    try:
+        for connection in connections.all():
+            connection.ensure_connection()
+        VoteSession.objects.exists()
+    except DatabaseError:
+        return False
+    return True
+
+
+def warm_scan_guard():
+    """Build the session code filter used by voting.scanguard"""
+    try:
+        scanguard.codes.refresh()
+    except DatabaseError:
+        return False
+    return True
+
+
+def warm_thread_pool(pool, threads):
+    """
+    Run warm_database on `threads` threads of `pool` (a ThreadPoolExecutor
+    that will serve requests); returns how many connected.
+    """
+    barrier = threading.Barrier(threads)
+
+    def warm():
+        # Hold each thread until all have a task, so no thread takes two
+        try:
+            barrier.wait(timeout=5)
+        except threading.BrokenBarrierError:
+            pass
+        return warm_database()
+
+    futures = [pool.submit(warm) for _ in range(threads)]
+    return sum(future.result() for future in futures)
+
+
+def warm_up():
+    """Run every warm-up step and return how long each one took, in milliseconds"""
+    timings = {}
+    for step in (warm_urls, warm_templates, warm_database, warm_scan_guard):
+        start = time.perf_counter()
+        step()
+        timings[step.__name__] = (time.perf_counter() - start) * 1000
+    return timings